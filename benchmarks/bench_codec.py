@@ -0,0 +1,102 @@
+"""
+Per-frame cost of each installed JSON backend on typical chat and live frames.
+Usage: python -m benchmarks.bench_codec [--users 20000]
+"""
+
+import argparse
+import json
+import timeit
+
+from dggbot.codec import BACKENDS, get_codec
+
+
+def names_payload(n_users: int) -> str:
+    users = [
+        {
+            "id": i,
+            "nick": f"chatter{i}",
+            "createdDate": "2019-06-08T11:22:33Z",
+            "features": ["subscriber", "flair13"] if i % 3 else [],
+        }
+        for i in range(n_users)
+    ]
+    return json.dumps({"connectioncount": n_users + 500, "users": users})
+
+
+MSG = json.dumps(
+    {
+        "id": 1,
+        "nick": "Fritz",
+        "createdDate": "2019-06-08T11:22:33.123456Z",
+        "features": ["subscriber", "flair13"],
+        "timestamp": 1700000000000,
+        "data": "PepoG this is a pretty average chat message, nothing special about it",
+    }
+)
+STREAMINFO = json.dumps(
+    {
+        "type": "dggApi:streamInfo",
+        "data": {
+            "streams": {
+                platform: {
+                    "live": True,
+                    "game": "Just Chatting",
+                    "preview": "https://example.com/preview.jpg",
+                    "status_text": "Debate night",
+                    "started_at": "2023-11-14T22:13:20+0000",
+                    "ended_at": None,
+                    "duration": 3600,
+                    "viewers": 12345,
+                    "id": "abc123",
+                    "platform": platform,
+                    "type": "livestream",
+                    "chat_url": None,
+                }
+                for platform in ("twitch", "youtube", "kick", "rumble")
+            }
+        },
+    }
+)
+OUTBOUND = {"data": "PepoG this is a reply from a bot"}
+
+
+def bench(func, *args, number: int) -> float:
+    """Best of 5 runs, in microseconds per call."""
+    return (
+        min(timeit.repeat(lambda: func(*args), number=number, repeat=5)) / number * 1e6
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20000)
+    args = parser.parse_args()
+
+    frames = {
+        "MSG": (MSG, 20000),
+        "streaminfo": (STREAMINFO, 5000),
+        f"NAMES ({args.users} users)": (names_payload(args.users), 5),
+    }
+    codecs = []
+    for name in BACKENDS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            print(f"{name} is not installed, skipping.")
+    baseline = get_codec("json")
+
+    for label, (frame, number) in frames.items():
+        base = bench(baseline.loads, frame, number=number)
+        print(f"\nloads {label}:")
+        for codec in codecs:
+            t = bench(codec.loads, frame, number=number)
+            print(f"  {codec.name:<8} {t:12.2f} us/frame  {base / t:5.2f}x")
+    base = bench(baseline.dumps, OUTBOUND, number=20000)
+    print("\ndumps MSG payload:")
+    for codec in codecs:
+        t = bench(codec.dumps, OUTBOUND, number=20000)
+        print(f"  {codec.name:<8} {t:12.2f} us/frame  {base / t:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
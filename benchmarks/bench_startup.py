@@ -0,0 +1,71 @@
+"""
+Startup cost: importing dggbot in a fresh interpreter, and constructing a client
+until its websocket is connected (to a local server, so the network doesn't count).
+Usage: python -m benchmarks.bench_startup [--runs 10]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+IMPORTS = {
+    "python": "pass",
+    "import dggbot": "import dggbot",
+    "from dggbot import DGGLive": "from dggbot import DGGLive",
+    "from dggbot import DGGBot": "from dggbot import DGGBot",
+    "from dggbot import AsyncDGGBot": "from dggbot import AsyncDGGBot",
+}
+
+
+def import_time(code: str, runs: int) -> float:
+    """Median seconds to run code in a new interpreter."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def connect_time(runs: int) -> tuple[float, float]:
+    """Median seconds to construct a DGGChat, and from construction to connected."""
+    from dggbot import DGGChat
+    from dggbot.testing import MockChatServer
+
+    construct, connected = [], []
+    with MockChatServer(users=0) as server:
+        config = server.config(flairs=None)
+        for _ in range(runs):
+            start = time.perf_counter()
+            chat = DGGChat(config=config)
+            built = time.perf_counter()
+            opened = threading.Event()
+            chat.ws.on_open = lambda ws: opened.set()
+            thread = threading.Thread(target=chat.run, daemon=True)
+            thread.start()
+            opened.wait(5)
+            done = time.perf_counter()
+            chat.ws.close()
+            thread.join(5)
+            chat.dispatcher.stop()
+            construct.append(built - start)
+            connected.append(done - start)
+    return statistics.median(construct), statistics.median(connected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    for name, code in IMPORTS.items():
+        print(f"{name:<32} {import_time(code, args.runs) * 1e3:8.1f} ms")
+    construct, connected = connect_time(args.runs)
+    print(f"{'DGGChat()':<32} {construct * 1e3:8.1f} ms")
+    print(f"{'DGGChat() to connected':<32} {connected * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
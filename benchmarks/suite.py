@@ -0,0 +1,397 @@
+"""
+Benchmarks of the parse -> dispatch -> reply hot path, compared to stored baselines.
+Times are the best of several runs, in microseconds per operation; memory is in bytes
+allocated (tracemalloc). Baselines are machine-specific: save one on the machine the
+comparisons run on. Both the baseline and the check take the best of 3 runs of a
+benchmark, since a busy machine only ever makes it slower.
+Usage: python -m benchmarks.suite [-k names] [--save | --compare] [--threshold 0.25]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+from typing import Callable
+
+from dggbot import DGGBot, DGGChat, DGGLive
+from dggbot.flairs import convert_flairs
+from dggbot.message import Message, convert_datetime
+from dggbot.testing import FLAIRS
+from dggbot.user import User
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# name: (setup() -> (func, calls per run), unit)
+BENCHMARKS: dict[str, tuple[Callable, str]] = {}
+
+
+def benchmark(name: str, unit: str = "us"):
+    """Register a benchmark, setup() returns the function to time and calls per run."""
+
+    def decorator(setup: Callable):
+        BENCHMARKS[name] = (setup, unit)
+        return setup
+
+    return decorator
+
+
+class InlineDispatcher:
+    """Runs jobs on the calling thread, so a frame's whole path is timed."""
+
+    running = True
+
+    def submit(self, func: Callable, *args, key=None):
+        func(*args)
+
+    def qsize(self) -> int:
+        return 0
+
+    def start(self):
+        pass
+
+    def stop(self, timeout: float = None):
+        pass
+
+
+def _config() -> dict:
+    return {
+        **DGGChat._CONFIG,
+        "flairs": None,
+        "flairCache": {"path": os.devnull},
+        "watchdog": {"budget": None},
+    }
+
+
+def _chat(cls=DGGBot, **kwargs):
+    from dggbot.flairs import Flair
+
+    client = cls(config=_config(), dispatcher=InlineDispatcher(), **kwargs)
+    if isinstance(client, DGGChat):
+        client._flairs.update((f["name"], Flair(**f)) for f in FLAIRS)
+        client.send_queue._write = lambda frame: None  # no socket
+    return client
+
+
+def _command(bot: DGGBot, name: str, func: Callable):
+    """Add func as command name, commands are named after their function."""
+
+    def command(msg, *args):
+        return func(msg, *args)
+
+    command.__name__ = name
+    bot.command()(command)
+
+
+def _user(i: int) -> dict:
+    return {
+        "id": i,
+        "nick": f"chatter{i}",
+        "createdDate": f"20{10 + i % 14}-06-08T11:22:33Z",
+        "features": ["subscriber", "flair13"] if i % 3 else [],
+    }
+
+
+def _frame(event: str, data: dict) -> str:
+    return f"{event} {json.dumps(data)}"
+
+
+MSG = _frame(
+    "MSG",
+    {
+        **_user(1),
+        "timestamp": 1700000000000,
+        "data": "PepoG this is a pretty average chat message, nothing special about it",
+    },
+)
+MIX = (
+    [MSG] * 16
+    + [_frame("JOIN", {**_user(i), "timestamp": 0}) for i in (2, 3)]
+    + [_frame("QUIT", {**_user(i), "timestamp": 0}) for i in (2, 3)]
+    + [
+        _frame("PRIVMSG", {"nick": "chatter4", "data": "hi", "messageid": 1}),
+        _frame("MUTE", {**_user(5), "data": "chatter6", "duration": 600}),
+    ]
+)
+
+
+# Chat frames
+@benchmark("on_message.msg")
+def _():
+    """MSG frames decoded and handled."""
+    chat = _chat(DGGChat)
+    chat.event("on_msg")(lambda msg: msg.data)
+    return lambda: chat._on_message(None, MSG), 20000
+
+
+@benchmark("on_message.mix")
+def _():
+    """A typical mix of 22 frames (per mix), with handlers for messages only."""
+    chat = _chat(DGGChat)
+    chat.event("on_msg")(lambda msg: msg.data)
+    on_message = chat._on_message
+
+    def run():
+        for frame in MIX:
+            on_message(None, frame)
+
+    return run, 500
+
+
+@benchmark("on_message.unhandled")
+def _():
+    """MSG frames without handlers, skipped before decoding."""
+    chat = _chat(DGGChat)
+    return lambda: chat._on_message(None, MSG), 50000
+
+
+@benchmark("on_message.reply")
+def _():
+    """!ping command replied to, up to the frame being queued."""
+    bot = _chat(owner="Owner")
+    _command(bot, "ping", lambda msg, *args: msg.reply("pong"))
+    frame = MSG.replace("PepoG this", "!ping this")
+    return lambda: bot._on_message(None, frame), 5000
+
+
+for _n in (5000, 20000, 50000):
+
+    @benchmark(f"on_names.{_n // 1000}k")
+    def _(n=_n):
+        """NAMES frame ingested into the roster, with cold profile caches."""
+        chat = _chat(DGGChat)
+        frame = _frame(
+            "NAMES", {"connectioncount": n, "users": [_user(i) for i in range(n)]}
+        )
+
+        def run():
+            chat.profiles.clear()
+            chat._on_message(None, frame)
+
+        return run, 1
+
+
+# Decoding helpers
+@benchmark("convert_datetime")
+def _():
+    return lambda: convert_datetime("2019-06-08T11:22:33.123456Z"), 20000
+
+
+@benchmark("convert_flairs")
+def _():
+    from dggbot.flairs import Flair
+
+    flairs = {f["name"]: Flair(**f) for f in FLAIRS}
+    return lambda: convert_flairs(flairs, ["subscriber", "flair13"]), 100000
+
+
+@benchmark("is_mentioned")
+def _():
+    chat = _chat(DGGChat)
+    user = User(1, "Fritz", None)
+    msg = Message(chat, "MSG", {"data": "is fritz around? PepoG nothing else here"})
+    return lambda: user.is_mentioned(msg), 100000
+
+
+# Commands
+@benchmark("on_command.100_commands")
+def _():
+    """Command lookup and call among 100 commands."""
+    bot = _chat(owner="Owner")
+    for i in range(100):
+        _command(bot, f"cmd{i}", lambda msg, *args: None)
+    msg = Message(bot, "MSG", {**_user(1), "data": "!cmd57 some args"})
+    return lambda: bot.on_command(msg), 20000
+
+
+# Live
+STREAMINFO = json.dumps(
+    {
+        "type": "dggApi:streamInfo",
+        "data": {
+            "streams": {
+                platform: {
+                    "live": True,
+                    "game": "Just Chatting",
+                    "preview": "https://example.com/preview.jpg",
+                    "status_text": "Debate night",
+                    "started_at": "2023-11-14T22:13:20+0000",
+                    "ended_at": None,
+                    "duration": 3600,
+                    "viewers": 12345,
+                    "id": "abc123",
+                    "platform": platform,
+                    "type": "livestream",
+                    "chat_url": None,
+                }
+                for platform in ("twitch", "youtube", "kick", "rumble")
+            }
+        },
+    }
+)
+VIDEO = {
+    "id": "dQw4w9WgXcQ",
+    "title": "Debate night",
+    "mediumThumbnailUrl": "https://example.com/m.jpg",
+    "highThumbnailUrl": "https://example.com/h.jpg",
+    "streamViewers": "12345",
+    "streamStartTime": "2023-11-14T22:13:20Z",
+    "streamEndTime": None,
+    "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "thumbnailHref": "https://example.com/t.jpg",
+    "publishDate": "2023-11-14T22:13:20Z",
+    "embedUrl": "https://www.youtube.com/embed/dQw4w9WgXcQ",
+}
+VIDEOS = json.dumps(
+    {"type": "dggApi:videos", "data": {"source": "youtube", "videos": [VIDEO] * 10}}
+)
+
+
+@benchmark("live.streaminfo")
+def _():
+    live = _chat(DGGLive)
+    live.event("on_streaminfo")(lambda info: None)
+    return lambda: live._on_message(None, STREAMINFO), 5000
+
+
+@benchmark("live.videos")
+def _():
+    live = _chat(DGGLive)
+    live.event("on_videos")(lambda videos: None)
+    return lambda: live._on_message(None, VIDEOS), 5000
+
+
+# Memory
+@benchmark("memory.roster_20k", unit="bytes")
+def _():
+    """Roster (and profile caches) of 20k users."""
+    frame = _frame(
+        "NAMES", {"connectioncount": 0, "users": [_user(i) for i in range(20000)]}
+    )
+
+    def run():
+        chat = _chat(DGGChat)
+        chat._on_message(None, frame)
+        return chat
+
+    return run
+
+
+@benchmark("memory.messages_10k", unit="bytes")
+def _():
+    """10k decoded messages kept, e.g. a log buffer."""
+    chat = _chat(DGGChat)
+    frames = [
+        MSG.replace('"nick": "chatter1"', f'"nick": "c{i}"') for i in range(10000)
+    ]
+    kept = []
+    chat.event("on_msg")(kept.append)
+
+    def run():
+        for frame in frames:
+            chat._on_message(None, frame)
+        return kept
+
+    return run
+
+
+def measure(name: str, quick: bool = False) -> float:
+    setup, unit = BENCHMARKS[name]
+    if unit == "bytes":
+        run = setup()
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = run()  # noqa: F841, measured while it's alive
+        gc.collect()  # only count what is kept
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return float(after - before)
+    func, number = setup()
+    if quick:
+        number, repeat = 1, 1
+    else:
+        func()  # warm up caches
+        repeat = 5
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def run(names: list[str], quick: bool = False, rounds: int = 1) -> dict[str, float]:
+    """Best result of each benchmark over rounds runs of the suite."""
+    results = {}
+    for _ in range(rounds):
+        for name in names:
+            value = measure(name, quick)
+            results[name] = min(value, results.get(name, value))
+    for name in names:
+        unit = BENCHMARKS[name][1]
+        print(f"{name:<28} {results[name]:14.2f} {unit}", file=sys.stderr)
+    return results
+
+
+def compare(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Names of the benchmarks more than threshold (0.25 for 25%) over their baseline."""
+    return [
+        name
+        for name, value in results.items()
+        if name in baseline and value > baseline[name] * (1 + threshold)
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", default="", help="only benchmarks whose name contains it")
+    parser.add_argument("--baseline", default=BASELINE)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--save", action="store_true", help="store results as baseline")
+    group.add_argument(
+        "--compare", action="store_true", help="exit 1 if a benchmark regressed"
+    )
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.k in name]
+    # The baseline is the best of 3 rounds, like the check below for regressions.
+    results = run(names, rounds=3 if args.save else 1)
+    if args.save:
+        stored = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                stored = json.load(f)["results"]
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": f"{platform.system()} {platform.machine()}",
+                    "results": {**stored, **results},
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    # Measure apparent regressions again, so one noisy run doesn't fail the check.
+    for _ in range(2):
+        for name in compare(results, baseline, args.threshold):
+            results[name] = min(results[name], measure(name))
+    print(f"\n{'benchmark':<28} {'baseline':>14} {'now':>14} {'change':>8}")
+    for name, value in results.items():
+        if name in baseline:
+            change = value / baseline[name] - 1 if baseline[name] else 0.0
+            print(f"{name:<28} {baseline[name]:14.2f} {value:14.2f} {change:+8.1%}")
+    if args.compare and (regressed := compare(results, baseline, args.threshold)):
+        print(f"\nRegressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,83 @@
-from .bot import DGGBot
-from .chat import DGGChat
-from .event import EventType
-from .flairs import Flair
-from .live import DGGLive
-from .live.message import Stream, StreamInfo, YoutubeVideo, YoutubeVod
-from .message import (
-    BroadcastMessage,
-    DonationMessage,
-    GiftSubMessage,
-    MassGiftMessage,
-    Message,
-    MuteMessage,
-    PinnedMessage,
-    PollMessage,
-    PrivateMessage,
-    SubscriptionMessage,
-    VoteMessage,
-)
+"""
+The clients and message classes are imported on first access (PEP 562), so
+"import dggbot" doesn't load requests, websocket-client or asyncio until they are used.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
 
 VERSION = "1.8.0"
+
+# Public name -> submodule it is imported from.
+_LAZY = {
+    "AsyncDGGBot": ".aio",
+    "AsyncDGGChat": ".aio",
+    "AsyncDGGLive": ".aio",
+    "DGGBot": ".bot",
+    "DGGChat": ".chat",
+    "ClientManager": ".manager",
+    "BucketType": ".cooldown",
+    "Dispatcher": ".dispatch",
+    "EventType": ".event",
+    "Flair": ".flairs",
+    "DGGLive": ".live",
+    "Stream": ".live.message",
+    "StreamInfo": ".live.message",
+    "YoutubeVideo": ".live.message",
+    "YoutubeVod": ".live.message",
+    "BroadcastMessage": ".message",
+    "DonationMessage": ".message",
+    "GiftSubMessage": ".message",
+    "MassGiftMessage": ".message",
+    "Message": ".message",
+    "MetricsRegistry": ".metrics",
+    "MuteMessage": ".message",
+    "PinnedMessage": ".message",
+    "PollMessage": ".message",
+    "PrivateMessage": ".message",
+    "SubscriptionMessage": ".message",
+    "VoteMessage": ".message",
+    "Priority": ".sender",
+}
+
+__all__ = ["VERSION", *_LAZY]
+
+
+def __getattr__(name: str):
+    if (module := _LAZY.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # later lookups don't go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+if TYPE_CHECKING:
+    from .aio import AsyncDGGBot, AsyncDGGChat, AsyncDGGLive
+    from .bot import DGGBot
+    from .chat import DGGChat
+    from .cooldown import BucketType
+    from .dispatch import Dispatcher
+    from .event import EventType
+    from .flairs import Flair
+    from .live import DGGLive
+    from .live.message import Stream, StreamInfo, YoutubeVideo, YoutubeVod
+    from .manager import ClientManager
+    from .message import (
+        BroadcastMessage,
+        DonationMessage,
+        GiftSubMessage,
+        MassGiftMessage,
+        Message,
+        MuteMessage,
+        PinnedMessage,
+        PollMessage,
+        PrivateMessage,
+        SubscriptionMessage,
+        VoteMessage,
+    )
+    from .metrics import MetricsRegistry
+    from .sender import Priority
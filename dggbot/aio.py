@@ -0,0 +1,277 @@
+"""
+asyncio versions of the chat clients.
+
+The websocket is still handled by websocket-client, but its socket is read from
+the running event loop instead of a blocking thread, and handlers/commands may be
+``async def`` functions.
+"""
+
+import asyncio
+import functools
+import inspect
+import time
+from typing import Any, Callable, Hashable
+
+from ._logging import _logger
+from .bot import DGGBot
+from .chat import DGGChat
+from .live import DGGLive
+from .reconnect import ConnectionState
+
+
+class LoopDispatcher:
+    """Dispatcher that runs jobs as callbacks on an asyncio event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None):
+        self.loop = loop
+        self._tasks: set[asyncio.Task] = set()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(qsize={self.qsize()})"
+
+    def qsize(self) -> int:
+        """Number of handler coroutines that have not finished yet."""
+        return len(self._tasks)
+
+    @property
+    def running(self) -> bool:
+        return self.loop is not None and self.loop.is_running()
+
+    def start(self):
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+
+    def stop(self, wait: bool = True):
+        for task in tuple(self._tasks):
+            task.cancel()
+
+    def submit(self, func: Callable, *args, key: Hashable = None, **kwargs) -> bool:
+        if self.loop is None:
+            raise RuntimeError("LoopDispatcher is not attached to an event loop")
+        callback = functools.partial(self._run, func, *args, **kwargs)
+        if _in_loop(self.loop):
+            self.loop.call_soon(callback)
+        else:
+            self.loop.call_soon_threadsafe(callback)
+        return True
+
+    def _run(self, func: Callable, *args, **kwargs):
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            _logger.exception(f"Unhandled exception in {func!r}")
+
+    def create_task(self, coro) -> asyncio.Task:
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and (err := task.exception()) is not None:
+            _logger.error(f"Unhandled exception in {task.get_coro()!r}", exc_info=err)
+
+
+class LoopTransport:
+    """
+    websocket-client custom dispatcher that reads the socket from an event loop.
+    See ``WebSocketApp.run_forever(dispatcher=...)``.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, app):
+        self.loop = loop
+        self.app = app
+        self._readers: dict[int, tuple[Any, Callable]] = {}
+
+    # Interface used by websocket-client's WrappedDispatcher
+    def signal(self, sig: int, handler: Callable):
+        """Signals are left to whoever owns the event loop."""
+
+    def abort(self):
+        self._call(self._remove_all)
+
+    def read(self, sock, callback: Callable):
+        self._call(self._add_reader, sock, callback)
+
+    def buffwrite(self, sock, data: bytes, send: Callable, disconnect: Callable):
+        try:
+            send(sock, data)
+        except Exception as err:
+            disconnect(err)
+
+    def timeout(self, seconds: float, callback: Callable, *args):
+        self._call(self.loop.call_later, seconds or 0, callback, *args)
+
+    # Internal
+    def wakeup(self) -> bool:
+        """Run the read callbacks, e.g. so websocket-client notices a close()."""
+        for fd in tuple(self._readers):
+            self._call(self._on_readable, fd)
+        return bool(self._readers)
+
+    def _call(self, func: Callable, *args):
+        if _in_loop(self.loop):
+            func(*args)
+        else:
+            self.loop.call_soon_threadsafe(func, *args)
+
+    def _add_reader(self, sock, callback: Callable):
+        fd = sock.fileno()
+        self._readers[fd] = (sock, callback)
+        self.loop.add_reader(fd, self._on_readable, fd)
+
+    def _on_readable(self, fd: int):
+        if fd not in self._readers:
+            return
+        sock, callback = self._readers[fd]
+        while True:
+            if not callback() or self.app.sock is None:
+                self._remove(fd)
+                return
+            # SSL sockets may already hold decrypted data that select() won't report.
+            if not (hasattr(sock, "pending") and sock.pending()):
+                return
+
+    def _remove(self, fd: int):
+        if self._readers.pop(fd, None) is not None:
+            self.loop.remove_reader(fd)
+
+    def _remove_all(self):
+        for fd in tuple(self._readers):
+            self._remove(fd)
+
+
+class AsyncClientMixin:
+    """
+    Turns a WSBase client into an asyncio client.
+    Handlers and commands can be regular functions or coroutine functions.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("dispatcher", LoopDispatcher())
+        super().__init__(*args, **kwargs)
+        self._transport: LoopTransport = None
+        self._closed: asyncio.Future = None
+        self._stopping = False
+        self._backoff_sleep: asyncio.Task = None
+
+    def _call_handler(self, func: Callable, *args, **kwargs):
+        result = func(*args, **kwargs)
+        if inspect.isawaitable(result):
+            return self.dispatcher.create_task(result)
+        return result
+
+    # Run methods
+    async def run(self, origin: str = None):
+        loop = asyncio.get_running_loop()
+        self.dispatcher.start()
+        self.last_error = None
+        self._set_state(ConnectionState.CONNECTING)
+        self._closed = loop.create_future()
+        self._transport = LoopTransport(loop, self.ws)
+        # Only the handshake runs in an executor, the socket is then read from the loop.
+        await loop.run_in_executor(
+            None,
+            functools.partial(
+                self.ws.run_forever,
+                origin=origin or self.config["wss-origin"],
+                dispatcher=self._transport,
+                ping_interval=self.ping_interval or 0,
+                reconnect=0,
+            ),
+        )
+        watchdog = loop.create_task(self._watch_pings())
+        try:
+            await self._closed
+        finally:
+            watchdog.cancel()
+
+    async def _watch_pings(self):
+        """
+        Drop the connection when a ping isn't answered within ping_timeout.
+        websocket-client only checks this once with a custom dispatcher.
+        """
+        if not (self.ping_interval and self.ping_timeout):
+            return
+        ws = self.ws
+        while True:
+            await asyncio.sleep(self.ping_timeout)
+            if (
+                ws.last_ping_tm
+                and ws.last_pong_tm < ws.last_ping_tm
+                and time.time() - ws.last_ping_tm > self.ping_timeout
+            ):
+                from websocket import WebSocketTimeoutException
+
+                self.last_error = WebSocketTimeoutException("ping/pong timed out")
+                _logger.warning(f"No pong from {self.wss}, reconnecting.")
+                self._disconnect()
+                return
+
+    async def run_forever(self, origin: str = None, sleep: float = None):
+        """
+        Runs the client until close() is called, reconnecting with exponential backoff.
+        :param sleep: base delay before reconnecting, defaults to the "connection" config.
+        """
+        if sleep is not None:
+            self.backoff.base = sleep
+        self._stopping = False
+        while not self._stopping:
+            error = None
+            try:
+                await self.run(origin=origin)
+            except Exception as err:
+                error = err
+                _logger.error(f"Unhandled exception in run_forever: {err}")
+            if self._stopping:
+                break
+            delay = self._reconnect_delay(error or self.last_error)
+            self._backoff_sleep = asyncio.ensure_future(asyncio.sleep(delay))
+            await asyncio.wait((self._backoff_sleep,))
+        self._set_state(ConnectionState.STOPPED)
+
+    async def close(self):
+        """Close the websocket and stop run_forever."""
+        self._stopping = True
+        if self._backoff_sleep is not None:
+            self._backoff_sleep.cancel()
+        self._on_stop()
+        self._disconnect()
+        if self._closed is not None:
+            await self._closed
+
+    def _disconnect(self):
+        self.ws.keep_running = False
+        if self._transport is None or not self._transport.wakeup():
+            if self._closed is not None:
+                _resolve(self._closed)
+
+    def _on_close(self, ws, *args):
+        super()._on_close(ws, *args)
+        if self._closed is not None:
+            self._closed.get_loop().call_soon_threadsafe(_resolve, self._closed)
+
+
+class AsyncDGGChat(AsyncClientMixin, DGGChat):
+    pass
+
+
+class AsyncDGGBot(AsyncClientMixin, DGGBot):
+    pass
+
+
+class AsyncDGGLive(AsyncClientMixin, DGGLive):
+    pass
+
+
+def _in_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+def _resolve(future: asyncio.Future, result: Any = None):
+    if not future.done():
+        future.set_result(result)
@@ -1,34 +1,58 @@
-import inspect
-import itertools
 import time
-from typing import Callable, Union
+from typing import Callable, Iterable, Union
 
+from ._logging import _logger
 from .chat import DGGChat, EventType
+from .commands import Command, CommandRouter, Saturation
+from .cooldown import BucketType
+from .errors import CommandBusy
 from .message import Message, PrivateMessage
+from .metrics import LatencyStats
+from .ratelimit import RateGovernor
+from .sender import Priority
 
 
 class DGGBot(DGGChat):
+    _always_decode = frozenset((EventType.MESSAGE, EventType.PRIVMSG))
+    _retried_errors = frozenset(("throttled",))
+
     def __init__(
         self,
         auth_token: str = None,
         owner: str = None,
-        prefix="!",
+        prefix: Union[str, Iterable[str]] = "!",
         wss: str = None,
         *,
         sid: str = None,
         rememberme: str = None,
+        case_insensitive: bool = False,
         **kwargs,
     ):
+        """
+        :param prefix: command prefix, or several prefixes, e.g. ("!", "$").
+        :param case_insensitive: match command names regardless of case.
+        """
         super().__init__(
             auth_token=auth_token, wss=wss, sid=sid, rememberme=rememberme, **kwargs
         )
         self._owner = owner.lower() if owner else None
-        self.prefix = prefix
-        self._commands = {}
+        self.router = CommandRouter(prefix, case_insensitive)
+        self._commands = self.router.commands
         bot_config = self.config.get("bot", dict())
-        self._send_cooldown = bot_config.get("sendMsgCooldown", 0)
         self._avoid_dupe = bot_config.get("avoidDupe", False)
         self._last_msg: tuple[str, float] = None
+        self.governor = RateGovernor.from_config(bot_config)
+        self.send_queue.governor = self.governor
+
+    @property
+    def prefix(self) -> Union[str, tuple[str, ...]]:
+        """Command prefix, or the tuple of prefixes when there are several."""
+        prefixes = self.router.prefixes
+        return prefixes[0] if len(prefixes) == 1 else prefixes
+
+    @prefix.setter
+    def prefix(self, prefix: Union[str, Iterable[str]]):
+        self.router.prefixes = prefix
 
     def command(
         self,
@@ -36,53 +60,115 @@ class DGGBot(DGGChat):
         *args,
         cooldown: Union[int, float] = None,
         whisper_only: bool = False,
+        cooldown_bucket: str = BucketType.COMMAND,
+        max_concurrency: int = None,
+        saturation: str = Saturation.QUEUE,
+        timeout: float = None,
         **kwargs,
     ):
         """
         Decorator to add commands to bot.
         :param aliases: aliases to call the function besides the function name.
         :param cooldown: Cooldown (in seconds) between command uses.
+        :param cooldown_bucket: who shares the cooldown, see DGGChat.cooldown().
+        :param max_concurrency: maximum number of uses of the command running at once.
+        :param saturation: Saturation.QUEUE, DROP or REJECT, when max_concurrency is reached.
+        :param timeout: seconds before an async command is cancelled (sync ones are only logged).
         :param whisper_only: Command will only run when through whispers/private messages.
         :return:
         """
 
         def decorator(func: Callable):
-            func._args = inspect.getfullargspec(func)
-            if cooldown is not None:
-                func._cooldown = cooldown
-                func._last_called = 0
             if whisper_only:
                 func = self.check(lambda msg: isinstance(msg, PrivateMessage))(func)
-            for cmd_name in itertools.chain((func.__name__,), aliases):
-                if cmd_name in self._commands:
-                    raise Exception(f'Command name "{cmd_name}" already exists.')
-                else:
-                    self._commands[cmd_name] = func
+            if cooldown is not None:
+                func = self.cooldown(cooldown, cooldown_bucket)(func)
+            self.router.add(
+                Command(
+                    func,
+                    aliases=aliases,
+                    max_concurrency=max_concurrency,
+                    saturation=saturation,
+                    timeout=timeout,
+                )
+            )
             return func
 
         return decorator
 
     def is_command(self, msg: Message) -> bool:
         if isinstance(msg.data, str):
-            return msg.data.startswith(self.prefix)
-
-    def on_command(self, msg: Message):
-        cmd = msg.data.split(" ")[0][1:]
-        if cmd in self._commands:
-            func: callable = self._commands[cmd]
-            if hasattr(func, "_cooldown"):
-                ts = int(msg.timestamp.timestamp())
-                if (ts - func._last_called) < (func._cooldown):
-                    return
-                func._last_called = ts
-            if hasattr(func, "_perms"):
-                perms = func._perms
-                if any(not perm(msg) for perm in perms):
-                    return
-            args = msg.data.split(" ", len(func._args.args) - (not func._args.varargs))[
-                1:
-            ]
-            func(msg, *args)
+            return self.router.has_prefix(msg.data)
+
+    def on_command(self, msg: Message, queued: float = None):
+        """
+        :param queued: time.monotonic() when the message was queued for the dispatcher.
+        """
+        if (match := self.router.match(msg.data)) is None:
+            return
+        command, rest = match
+        if queued is not None:
+            self.latency.record(
+                LatencyStats.DISPATCH_LAG,
+                msg.type.lower(),
+                time.monotonic() - queued,
+                command.name,
+            )
+        if (command.checks or command.cooldowns) and not self._checks_pass(
+            command.func, msg
+        ):
+            return
+        try:
+            args = command.parse_args(rest)
+        except ValueError as err:
+            self.on_event("command_error", msg, err)
+            return
+        status = command.acquire(msg, args)
+        self._command_uses.inc(self.metrics_name, command.name, status)
+        if status == "run":
+            self._run_command(command, msg, args)
+        elif status == Saturation.REJECT:
+            self.on_event("command_error", msg, CommandBusy(command.name))
+        elif status == Saturation.DROP:
+            _logger.debug(f"Dropped {command!r} from {msg.nick}, it is saturated.")
+
+    def _run_command(self, command: Command, msg: Message, args: list):
+        """Runs the command, then any invocations that were queued meanwhile."""
+        while True:
+            start = time.monotonic()
+            name = f"command:{command.name}"
+            job = self.watchdog.begin(name, "command", start)
+            try:
+                result = self._call_handler(command.callback, msg, *args)
+                self._record_handler_time(msg.type.lower(), start, result, command.name)
+            except Exception:
+                _logger.exception(f"Unhandled exception in command {command.name}")
+                result = None
+            self.watchdog.finish(job, result)
+            if hasattr(result, "add_done_callback"):  # async command
+                result.add_done_callback(lambda _: self._command_done(command))
+                return
+            if command.timeout is not None:
+                if (elapsed := time.monotonic() - start) > command.timeout:
+                    _logger.warning(
+                        f"Command {command.name} took {elapsed:.2f}s, "
+                        f"over its {command.timeout}s timeout."
+                    )
+            if (queued := command.release()) is None:
+                return
+            msg, args = queued
+
+    def _command_done(self, command: Command):
+        if (queued := command.release()) is not None:
+            self.dispatcher.submit(self._run_command, command, *queued)
+
+    def _register_metrics(self):
+        super()._register_metrics()
+        self._command_uses = self.metrics.counter(
+            "dggbot_commands_total",
+            "Command invocations, by what happened to them (run, queue, drop, reject).",
+            ("client", "command", "status"),
+        )
 
     def check(self, *check_funcs: Callable):
         """
@@ -105,14 +191,20 @@ class DGGBot(DGGChat):
 
     def _post_message(self, msg: Message):
         if msg.type in (EventType.MESSAGE, EventType.PRIVMSG) and self.is_command(msg):
-            self.on_command(msg)
+            # Commands run on the dispatcher so the websocket thread never waits on them.
+            self.dispatcher.submit(
+                self._run_queued_command, msg, time.monotonic(), key=msg.nick_lower
+            )
 
-    def send(self, msg: str):
-        now = time.time()
-        if self._last_msg is not None:
-            if now - self._last_msg[1] < self._send_cooldown:
-                return
-            if self._avoid_dupe and msg == self._last_msg[0]:
-                msg += " ."
-        super().send(msg)
-        self._last_msg = (msg, now)
+    def _run_queued_command(self, msg: Message, queued: float):
+        self.on_command(msg, queued)
+
+    def send(self, msg: str, priority: int = Priority.NORMAL):
+        """
+        Queue a message to chat. Messages are delayed by the rate governor instead of dropped.
+        :param priority: Priority lane, e.g. Priority.HIGH for moderation replies.
+        """
+        if self._avoid_dupe and self._last_msg is not None and msg == self._last_msg[0]:
+            msg += " ."
+        super().send(msg, priority)
+        self._last_msg = (msg, time.time())
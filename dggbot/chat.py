@@ -1,9 +1,8 @@
-import json
-from typing import Union
-
-import requests
+import time
+from typing import Callable, Iterable, Mapping, Union
 
 from ._logging import _logger
+from .cooldown import BucketType, Cooldowns, cooldown_check
 from .errors import (
     AccountTooYoung,
     Banned,
@@ -18,8 +17,8 @@ from .errors import (
     TooManyConnections,
 )
 from .event import EventType
-from .flairs import Flair, convert_flairs, flair_converter
-from .funcs import threaded
+from .flairs import Flair, FlairCatalog
+from .mention import MentionMatcher
 from .message import (
     BroadcastMessage,
     DonationMessage,
@@ -32,13 +31,18 @@ from .message import (
     PrivateMessage,
     SubscriptionMessage,
     VoteMessage,
-    convert_datetime,
 )
+from .metrics import LatencyStats
+from .profiles import ProfileCache
+from .roster import Roster
+from .sender import Priority, SendQueue
+from .standby import FrameWindow, Standby
 from .user import User
 from .wsbase import WSBase
 
 
 class DGGChat(WSBase):
+    _hard_errors = (Banned, TooManyConnections)
     _CONFIG = {
         "wss": "wss://chat.destiny.gg/ws",
         "wss-origin": "https://www.destiny.gg",
@@ -55,8 +59,18 @@ class DGGChat(WSBase):
         sid: str = None,
         rememberme: str = None,
         config: Union[str, dict[str, dict]] = None,
+        decode: bool = None,
+        mention_aliases: Iterable[str] = (),
+        standby: bool = None,
         **kwargs,
     ):
+        """
+        :param decode: set to False to skip decoding frames entirely, e.g. for an
+            archiver that only uses on_raw handlers. Defaults to the "decode" config key.
+        :param mention_aliases: other names that count as mentioning the chat user.
+        :param standby: keep a second, read-only socket to the chat and merge its frames,
+            so a reconnect doesn't lose messages. Defaults to the "standby" config section.
+        """
         cookie = (
             f"authtoken={auth_token}"
             if auth_token
@@ -66,11 +80,26 @@ class DGGChat(WSBase):
                 else None
             )
         )
-        super().__init__(wss, cookie, config=config)
+        super().__init__(wss, cookie, config=config, **kwargs)
         self.user = None
-        self._flairs = flair_converter(self.config["flairs"])
+        self._flairs = FlairCatalog.shared(self.config)
+        self.profiles = ProfileCache(self._flairs)
+        # Users decoded with placeholders for unknown flairs are rebuilt after a refresh.
+        self._flairs.add_refresh_callback(self.profiles.clear)
         self.authenticated = False
-        self._users = {}
+        self.roster = Roster()
+        self._decoded: frozenset = None
+        self.decode = self.config.get("decode", True) if decode is None else decode
+        self._mention_aliases = tuple(mention_aliases)
+        self.mentions = MentionMatcher(self._mention_aliases)
+        self.send_queue = SendQueue(self._write_frame)
+        self.cooldowns = Cooldowns()
+        standby_config = self.config.get("standby") or {}
+        self.standby: Standby = None
+        self._frames: FrameWindow = None
+        if standby_config.get("enabled", False) if standby is None else standby:
+            self.standby = Standby(self, self._on_message)
+            self._frames = FrameWindow(standby_config.get("window", 4096))
 
     @property
     def username(self) -> str:
@@ -86,6 +115,8 @@ class DGGChat(WSBase):
 
     # The following two functions are probably pointless now with the ME event, but I'll leave them in for now. - Fritz
     def _get_username_from_token(self, auth_token: str) -> Union[str, None]:
+        import requests
+
         r = requests.get(
             f"{self.config['baseurl']}{self.config['endpoints']['userinfo']}?token={auth_token}"
         )
@@ -98,6 +129,8 @@ class DGGChat(WSBase):
             )
 
     def _get_username_from_sid(self, cookie: str) -> Union[str, None]:
+        import requests
+
         headers = {"cookie": cookie}
         r = requests.get(
             self.config["baseurl"] + self.config["endpoints"]["user"],
@@ -113,11 +146,12 @@ class DGGChat(WSBase):
             )
 
     @property
-    def users(self) -> dict:
-        return self._users.copy()
+    def users(self) -> Mapping[str, User]:
+        """Read-only snapshot of the users in chat by lowercase nick."""
+        return self.roster.snapshot()
 
     def get_user(self, username: str) -> Union[User, None]:
-        return self._users.get(username.lower())
+        return self.roster.get(username)
 
     def get_flair(self, name: str) -> Flair:
         return self._flairs[name]
@@ -136,70 +170,240 @@ class DGGChat(WSBase):
         "toomanyconnections": TooManyConnections,
     }
 
+    # Event types decoded into a specific Message subclass, any other type uses Message.
+    _message_types = {
+        EventType.BROADCAST: BroadcastMessage,
+        EventType.DEATH: MuteMessage,
+        EventType.DONATION: DonationMessage,
+        EventType.GIFTSUB: GiftSubMessage,
+        EventType.MASSGIFT: MassGiftMessage,
+        EventType.MUTE: MuteMessage,
+        EventType.PIN: PinnedMessage,
+        EventType.POLLSTART: PollMessage,
+        EventType.POLLSTOP: PollMessage,
+        EventType.PRIVMSG: PrivateMessage,
+        EventType.SUBSCRIPTION: SubscriptionMessage,
+        EventType.VOTECAST: VoteMessage,
+    }
+    # Frames handled by the client instead of being decoded into messages (None to ignore).
+    _frame_handlers = {
+        EventType.ERROR: "_on_err_frame",
+        EventType.ME: "_on_me_frame",
+        EventType.NAMES: "_on_names_frame",
+        EventType.PRIVMSGSENT: "_on_privmsgsent_frame",
+    }
+    # Frames the client keeps track of, whether or not there are handlers for them.
+    _bookkeeping = {
+        EventType.JOIN: "_on_join_frame",
+        EventType.QUIT: "_on_quit_frame",
+    }
+    # Event types always decoded into messages, e.g. for _post_message. MSG and PRIVMSG
+    # are decoded anyway when a subclass overrides _post_message.
+    _always_decode = frozenset()
+
+    def _decoded_events(self) -> frozenset:
+        """Event types that have to be decoded into messages."""
+        if self._decoded is None:
+            decoded = set(self._always_decode)
+            if type(self)._post_message is not DGGChat._post_message:
+                decoded.update((EventType.MESSAGE, EventType.PRIVMSG))
+            for event in self._events:
+                if event.startswith("on_") and event != "on_raw":
+                    decoded.add(event[3:].upper())
+            if "on_mention" in self._events:
+                decoded.update((EventType.MESSAGE, EventType.PRIVMSG))
+            self._decoded = frozenset(decoded)
+        return self._decoded
+
+    def _events_changed(self):
+        self._decoded = None
+
+    def raw(self):
+        """
+        Decorator to run function with (event_type, payload, receive_time) for every frame,
+        before any decoding. Shortcut for event('on_raw').
+        Raw handlers run in order on the receive thread, so keep them quick.
+        """
+        return self.event("on_raw")
+
     def _on_message(self, ws, message: str):
-        _logger.debug(f"_on_message: {message}")
-        event_type, data = message.split(maxsplit=1)
-        data = json.loads(data)
-        if event_type == EventType.ME:
-            if data is not None:
-                self.user = User(
-                    data["id"],
-                    data["nick"],
-                    convert_datetime(data.get("createdDate")),
-                    convert_flairs(self._flairs, data.get("features")),
-                )
-            else:
-                self.user = None
+        received = time.time()
+        _logger.debug("_on_message: %s", message)
+        event_type, payload = message.split(maxsplit=1)
+        if self._frames is not None and not self._merge_frame(ws, event_type, message):
             return
-        elif event_type in (EventType.MUTE, EventType.DEATH):
-            msg = MuteMessage(self, event_type, data)
-        elif event_type == EventType.PRIVMSG:
-            msg = PrivateMessage(self, event_type, data)
-        elif event_type == EventType.PRIVMSGSENT:
+        self._frames_received.inc(self.metrics_name, event_type)
+        if raw_handlers := self._events.get("on_raw"):
+            self._run_handlers(raw_handlers, (event_type, payload, received), {})
+        if not self.decode:
             return
-        elif event_type == EventType.SUBSCRIPTION:
-            msg = SubscriptionMessage(self, event_type, data)
-        elif event_type == EventType.MASSGIFT:
-            msg = MassGiftMessage(self, event_type, data)
-        elif event_type == EventType.GIFTSUB:
-            msg = GiftSubMessage(self, event_type, data)
-        elif event_type == EventType.DONATION:
-            msg = DonationMessage(self, event_type, data)
-        elif event_type == EventType.BROADCAST:
-            msg = BroadcastMessage(self, event_type, data)
-        elif event_type == EventType.ERROR:
-            if (desc := data["description"]) in self._err_dict:
-                self.on_event("error", self._err_dict[desc])
-                raise self._err_dict[desc]
-            else:
-                _logger.error(f"Unknown error from message: {message}")
-                self.on_event("error", data)
-                raise Exception(desc)
-        elif event_type == EventType.NAMES:
-            self.on_names(data["connectioncount"], data["users"])
+        if event_type in self._frame_handlers:
+            if (handler := self._frame_handlers[event_type]) is not None:
+                getattr(self, handler)(self.codec.loads(payload))
             return
-        elif event_type == EventType.PIN:
-            msg = PinnedMessage(self, event_type, data)
-        elif event_type in (EventType.POLLSTART, EventType.POLLSTOP):
-            msg = PollMessage(self, event_type, data)
-        elif event_type == EventType.VOTECAST:
-            msg = VoteMessage(self, event_type, data)
-        else:
-            msg = Message(self, event_type, data)
-        if event_type == EventType.QUIT:
-            self._users.pop(msg.nick_lower, None)
-        elif event_type == EventType.JOIN:
-            self._users[msg.nick_lower] = msg.user
-
-        self.on_event(event_type.lower(), msg)
-        if event_type in (EventType.MESSAGE, EventType.PRIVMSG) and self.is_mentioned(
-            msg
+        decode = event_type in self._decoded_events()
+        bookkeeping = self._bookkeeping.get(event_type)
+        # Our own MSG coming back means the server accepted one we sent.
+        echo = event_type == EventType.MESSAGE and self.send_queue.unacked
+        if not decode and bookkeeping is None and not echo:
+            return
+        data = self.codec.loads(payload)
+        if echo and data.get("nick") == self.username:
+            self.send_queue.acknowledged(event_type)
+        if (timestamp := data.get("timestamp")) is not None:
+            self.latency.record(
+                LatencyStats.SERVER_LAG,
+                event_type.lower(),  # the event of the other measurements, e.g. "msg"
+                received - timestamp / 1000,
+            )
+        if bookkeeping is not None:
+            getattr(self, bookkeeping)(data)
+        if decode:
+            self._dispatch_message(
+                self._message_types.get(event_type, Message)(self, event_type, data)
+            )
+
+    # Frames of the standby socket that are about the connection itself, not the chat.
+    _standby_ignored = frozenset(
+        (EventType.ERROR, EventType.ME, EventType.NAMES, EventType.PRIVMSGSENT)
+    )
+
+    def _merge_frame(self, ws, event_type: str, message: str) -> bool:
+        """Whether a frame from either socket is new and should be handled."""
+        if event_type not in self._standby_ignored:
+            return self._frames.first(message)
+        # Frames about one connection are not deduplicated: a second identical ERR
+        # (e.g. throttled) from the primary socket is a new error.
+        if ws is self.standby.ws:
+            if event_type == EventType.ERROR:
+                desc = self.codec.loads(message.split(maxsplit=1)[1])["description"]
+                _logger.warning(f"Standby error: {desc}")
+                self.standby.last_error = self._err_dict.get(desc)
+            # The standby's NAMES is only used when there is no other up to date roster.
+            if event_type != EventType.NAMES or self._connected:
+                return False
+        return True
+
+    def _dispatch_message(self, msg: Message):
+        self.on_event(msg.type.lower(), msg)
+        if (
+            msg.type in (EventType.MESSAGE, EventType.PRIVMSG)
+            and "on_mention" in self._events
+            and self.is_mentioned(msg)
         ):
             self.on_event("mention", msg)
         self._post_message(msg)
 
+    def _on_me_frame(self, data: Union[dict, None]):
+        if data is not None:
+            self.user = self.profiles.user_from(data)
+        else:
+            self.user = None
+        self.mentions = MentionMatcher((self.username, *self._mention_aliases))
+
+    # ERR descriptions that refuse a MSG or PRIVMSG we sent.
+    _send_errors = frozenset(
+        (
+            "duplicate",
+            "invalidmsg",
+            "muted",
+            "needlogin",
+            "nopermission",
+            "notfound",
+            "privmsgaccounttooyoung",
+            "submode",
+            "throttled",
+        )
+    )
+    # Resend frames refused with these errors instead of dropping them.
+    _retried_errors = frozenset()
+
+    def _on_err_frame(self, data: dict):
+        desc = data["description"]
+        error = self._err_dict.get(desc)
+        self._chat_errors.inc(
+            self.metrics_name, error.__name__ if error is not None else desc
+        )
+        if desc in self._send_errors:
+            self.send_queue.rejected(
+                retry=desc in self._retried_errors, throttled=desc == "throttled"
+            )
+        if error is not None:
+            self._on_chat_error(error)
+            self.on_event("error", error)
+            raise error
+        _logger.error(f"Unknown error from message: {data}")
+        self.on_event("error", data)
+        raise Exception(desc)
+
+    def _on_names_frame(self, data: dict):
+        # Replaced on the receive thread, so the JOIN/QUIT frames that follow apply after it.
+        self.roster.replace(self.profiles.user_from(user) for user in data["users"])
+        self.dispatcher.submit(self.on_names, data["connectioncount"], data["users"])
+
+    def _on_privmsgsent_frame(self, data: dict):
+        self.send_queue.acknowledged(EventType.PRIVMSG)
+
+    def _on_join_frame(self, data: dict):
+        self.roster.add(self.profiles.user_from(data))
+
+    def _on_quit_frame(self, data: dict):
+        self.roster.remove(data["nick"])
+
+    def _register_metrics(self):
+        super()._register_metrics()
+        self._chat_errors = self.metrics.counter(
+            "dggbot_chat_errors_total", "ERR replies from chat.", ("client", "kind")
+        )
+        for name, help_, kind, func in (
+            ("sent_total", "Frames sent.", "counter", lambda: self.send_queue.sent),
+            (
+                "send_errors_total",
+                "Frames that failed to send.",
+                "counter",
+                lambda: self.send_queue.errors,
+            ),
+            (
+                "send_coalesced_total",
+                "Frames replaced by a newer one before being sent.",
+                "counter",
+                lambda: self.send_queue.coalesced,
+            ),
+            (
+                "send_retried_total",
+                "Frames sent again after the server asked to wait.",
+                "counter",
+                lambda: self.send_queue.retried,
+            ),
+            (
+                "send_queue_depth",
+                "Frames waiting to be sent.",
+                "gauge",
+                lambda: self.send_queue.qsize(),
+            ),
+            ("roster_users", "Users in chat.", "gauge", lambda: len(self.roster)),
+            (
+                "duplicate_frames_total",
+                "Frames dropped because the other socket already got them.",
+                "counter",
+                lambda: self._frames.duplicates if self._frames is not None else 0,
+            ),
+        ):
+            metric = getattr(self.metrics, kind)(f"dggbot_{name}", help_, ("client",))
+            metric.track(self.metrics_name, func=func)
+
     def _post_message(self, msg):
-        """Do stuff after _on_message"""
+        """
+        Do stuff after _on_message. Overriding it decodes every MSG and PRIVMSG, add
+        other event types to _always_decode to receive them without handlers.
+        """
+
+    def _on_stop(self):
+        if self.standby is not None:
+            self.standby.stop()
+
+    def _on_chat_error(self, error: type):
+        """Do stuff when an ERR message is received, before the error is raised."""
 
     def _on_open(self, ws):
         _logger.info(
@@ -207,49 +411,75 @@ class DGGChat(WSBase):
             + (f"as {self.username} " if self.username else "")
             + f"to {self.wss}."
         )
-        self._connected = True
+        self._on_connected()
+        if self.standby is not None:
+            self.standby.start()
+
+    def cooldown(self, seconds: float, bucket: str = BucketType.USER):
+        """
+        Decorator to put a command or event handler on cooldown each time it runs.
+        :param seconds: Cooldown in seconds, can be less than a second.
+        :param bucket: BucketType.USER (per user), COMMAND (per handler) or GLOBAL.
+        """
+
+        def decorator(func: Callable):
+            if not hasattr(func, "_cooldowns"):
+                func._cooldowns = []
+            func._cooldowns.append(
+                cooldown_check(self.cooldowns, func, seconds, bucket)
+            )
+            return func
+
+        return decorator
 
     def mention(self):
         """Decorator to run function on mentions. Shortcut for event('on_mention')."""
         return self.event("on_mention")
 
     def is_mentioned(self, msg: Union[Message, PrivateMessage]) -> bool:
-        return False if self.user is None else self.user.is_mentioned(msg)
+        return self.mentions.is_mentioned(msg.data)
+
+    def add_mention_alias(self, *aliases: str):
+        """Also count these names as mentions, e.g. nicknames or alternate spellings."""
+        self._mention_aliases += aliases
+        self.mentions.add(*aliases)
 
-    @threaded
     def on_names(self, connection_count: int, users: list):
         """Do stuff when the NAMES message is received upon connecting to chat."""
-        self._users = {
-            user["nick"].lower(): User(
-                user.get("id"),
-                user.get("nick"),
-                convert_datetime(user.get("createdDate")),
-                convert_flairs(self._flairs, user.get("features")),
-            )
-            for user in users
-        }
-        self.on_event("names", connection_count, self._users)
+        self.on_event("names", connection_count, self.users)
 
-    @threaded
-    def send_raw(self, event_type: str, payload: dict):
-        """Send the specified event_type and payload."""
-        self.ws.send(f"{event_type} {json.dumps(payload)}")
+    def send_raw(
+        self,
+        event_type: str,
+        payload: dict,
+        coalesce: bool = False,
+        *,
+        priority: int = Priority.NORMAL,
+    ):
+        """
+        Queue the specified event_type and payload to be sent.
+        :param coalesce: replace a pending frame of the same event_type instead of sending both.
+        :param priority: Priority lane of the frame, higher priority frames are sent first.
+        """
+        self.send_queue.put(
+            f"{event_type} {self.codec.dumps(payload)}",
+            event_type if coalesce else None,
+            priority=priority,
+            limited=event_type in (EventType.MESSAGE, EventType.PRIVMSG),
+        )
 
-    @threaded
-    def send(self, msg: str):
+    def send(self, msg: str, priority: int = Priority.NORMAL):
         """Send a message to chat."""
         assert len(msg) <= 512, "512 character limit broken"
-        payload = {"data": msg}
-        self.ws.send(f"MSG {json.dumps(payload)}")
+        self.send_raw(EventType.MESSAGE, {"data": msg}, priority=priority)
 
-    @threaded
-    def send_privmsg(self, nick: str, msg: str):
+    def send_privmsg(self, nick: str, msg: str, priority: int = Priority.NORMAL):
         """Send private message to someone."""
-        payload = {"nick": nick, "data": msg}
-        self.ws.send(f"PRIVMSG {json.dumps(payload)}")
+        self.send_raw(EventType.PRIVMSG, {"nick": nick, "data": msg}, priority=priority)
 
-    @threaded
     def cast_vote(self, vote: int):
-        """Participate in a chat poll."""
-        payload = {"vote": str(vote)}
-        self.ws.send(f"CASTVOTE {json.dumps(payload)}")
+        """Participate in a chat poll. Only the latest vote is sent if several are pending."""
+        self.send_raw("CASTVOTE", {"vote": str(vote)}, coalesce=True)
+
+    def _write_frame(self, frame: str):
+        self.ws.send(frame)
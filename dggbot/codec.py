@@ -0,0 +1,82 @@
+"""
+JSON codecs used to decode inbound frames and encode outbound payloads.
+A faster backend (orjson or msgspec) is used when installed, with json as fallback.
+"""
+
+import json
+from typing import Any, Callable, Union
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+class JSONCodec:
+    """
+    :param name: backend name.
+    :param loads: function decoding a str (or bytes) into Python objects.
+    :param dumps: function encoding Python objects into a str.
+    :param errors: exceptions raised by loads for invalid json.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loads: Callable[[Union[str, bytes]], Any],
+        dumps,
+        errors: tuple[type, ...] = (ValueError,),
+    ):
+        self.name = name
+        self.loads = loads
+        self.dumps: Callable[[Any], str] = dumps
+        self.errors = errors
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}<{self.name}>"
+
+
+def _orjson() -> JSONCodec:
+    import orjson
+
+    return JSONCodec(
+        "orjson",
+        orjson.loads,
+        lambda obj: orjson.dumps(obj).decode(),
+        (orjson.JSONDecodeError,),
+    )
+
+
+def _msgspec() -> JSONCodec:
+    import msgspec
+
+    decoder, encoder = msgspec.json.Decoder(), msgspec.json.Encoder()
+    return JSONCodec(
+        "msgspec",
+        decoder.decode,
+        lambda obj: encoder.encode(obj).decode(),
+        (msgspec.DecodeError,),
+    )
+
+
+def _json() -> JSONCodec:
+    return JSONCodec("json", json.loads, json.dumps, (json.JSONDecodeError,))
+
+
+_factories = {"orjson": _orjson, "msgspec": _msgspec, "json": _json}
+_codecs: dict[str, JSONCodec] = {}
+
+
+def get_codec(name: str = "auto") -> JSONCodec:
+    """
+    Returns the codec for the given backend.
+    "auto" picks the first installed backend of orjson, msgspec and json.
+    """
+    if name == "auto":
+        for backend in BACKENDS:
+            try:
+                return get_codec(backend)
+            except ImportError:
+                continue
+    if name not in _factories:
+        raise ValueError(f'Unknown JSON backend "{name}". Use one of {BACKENDS}.')
+    if name not in _codecs:
+        _codecs[name] = _factories[name]()
+    return _codecs[name]
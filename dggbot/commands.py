@@ -0,0 +1,221 @@
+"""
+Command entries compiled at registration time, and the router that finds them.
+"""
+
+import collections
+import functools
+import inspect
+import threading
+import types
+import typing
+from typing import Any, Callable, Iterable, Union
+
+
+class Saturation:
+    """What happens to an invocation when a command already runs max_concurrency times."""
+
+    QUEUE = "queue"  # run it once a running invocation finishes
+    DROP = "drop"  # ignore it
+    REJECT = "reject"  # ignore it and send a command_error event with CommandBusy
+
+
+class Command:
+    """
+    A registered command, with everything needed to invoke it precomputed.
+    :param func: function called with the message and the command arguments.
+    :param name: main name of the command.
+    :param aliases: other names of the command.
+    :param max_concurrency: maximum number of invocations running at the same time.
+    :param saturation: Saturation policy once max_concurrency is reached.
+    :param timeout: seconds after which async commands are cancelled (sync ones are only logged).
+    """
+
+    MAX_PENDING = 100
+
+    __slots__ = (
+        "func",
+        "callback",
+        "name",
+        "aliases",
+        "maxsplit",
+        "converters",
+        "checks",
+        "cooldowns",
+        "max_concurrency",
+        "saturation",
+        "timeout",
+        "running",
+        "_pending",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        func: Callable,
+        name: str = None,
+        aliases: Iterable[str] = (),
+        *,
+        max_concurrency: int = None,
+        saturation: str = Saturation.QUEUE,
+        timeout: float = None,
+    ):
+        if saturation not in (Saturation.QUEUE, Saturation.DROP, Saturation.REJECT):
+            raise ValueError(f'Unknown saturation policy "{saturation}"')
+        self.func = func
+        self.name = name or func.__name__
+        self.aliases = tuple(aliases)
+        self.max_concurrency = max_concurrency
+        self.saturation = saturation
+        self.timeout = timeout
+        self.running = 0
+        self._pending = collections.deque()
+        self._lock = threading.Lock()
+        self.callback = func
+        if timeout is not None and inspect.iscoroutinefunction(func):
+            self.callback = _with_timeout(func, timeout)
+        for attr in ("_perms", "_cooldowns"):
+            if not hasattr(func, attr):
+                setattr(func, attr, [])
+        # Shared with the function, so checks added after registration still apply.
+        self.checks: list[Callable] = func._perms
+        self.cooldowns: list[Callable] = func._cooldowns
+        spec = inspect.getfullargspec(func)
+        # Number of splits so the last named parameter gets the rest of the message.
+        self.maxsplit = len(spec.args) - (not spec.varargs) - 1
+        hints = _type_hints(func, spec.annotations)
+        self.converters = tuple(_converter(hints.get(arg)) for arg in spec.args[1:])
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}<{self.name}>"
+
+    @property
+    def names(self) -> tuple[str]:
+        return (self.name, *self.aliases)
+
+    @property
+    def pending(self) -> int:
+        """Number of queued invocations waiting for a running one to finish."""
+        return len(self._pending)
+
+    def acquire(self, msg, args: list) -> str:
+        """
+        Reserve a slot to run the command.
+        :return: "run", or the Saturation policy that was applied when all slots are taken.
+        """
+        with self._lock:
+            if self.max_concurrency is None or self.running < self.max_concurrency:
+                self.running += 1
+                return "run"
+            if self.saturation == Saturation.QUEUE:
+                if len(self._pending) >= self.MAX_PENDING:
+                    return Saturation.DROP
+                self._pending.append((msg, args))
+            return self.saturation
+
+    def release(self) -> Union[tuple[Any, list], None]:
+        """Free a slot, or hand it over to the next queued invocation which is returned."""
+        with self._lock:
+            if self._pending:
+                return self._pending.popleft()
+            self.running -= 1
+
+    def parse_args(self, rest: Union[str, None]) -> list:
+        """Split (and convert) the text after the command name into arguments."""
+        if rest is None or self.maxsplit < 0:
+            return []
+        args = rest.split(" ", self.maxsplit)
+        for i, (arg, convert) in enumerate(zip(args, self.converters)):
+            if convert is not None:
+                args[i] = convert(arg)
+        return args
+
+
+class CommandRouter:
+    """
+    Finds the command of a message with one dict lookup.
+    :param prefixes: command prefixes, e.g. "!" or ("!", "$").
+    :param case_insensitive: match command names regardless of case.
+    """
+
+    def __init__(
+        self, prefixes: Union[str, Iterable[str]] = "!", case_insensitive: bool = False
+    ):
+        self.prefixes = prefixes
+        self.case_insensitive = case_insensitive
+        self.commands: dict[str, Command] = {}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(prefixes={self.prefixes}, commands={len(self.commands)})"
+
+    @property
+    def prefixes(self) -> tuple[str, ...]:
+        return self._prefixes
+
+    @prefixes.setter
+    def prefixes(self, prefixes: Union[str, Iterable[str]]):
+        self._prefixes = (prefixes,) if isinstance(prefixes, str) else tuple(prefixes)
+        # Longest first, so "!!" wins over "!".
+        self._longest_first = tuple(sorted(self._prefixes, key=len, reverse=True))
+
+    def __contains__(self, name: str) -> bool:
+        return self._key(name) in self.commands
+
+    def add(self, command: Command):
+        for name in command.names:
+            if self._key(name) in self.commands:
+                raise Exception(f'Command name "{name}" already exists.')
+        for name in command.names:
+            self.commands[self._key(name)] = command
+
+    def get(self, name: str) -> Union[Command, None]:
+        return self.commands.get(self._key(name))
+
+    def has_prefix(self, text: str) -> bool:
+        return text.startswith(self.prefixes)
+
+    def match(self, text: str) -> Union[tuple[Command, Union[str, None]], None]:
+        """Returns the command and the text after its name (None if there is none)."""
+        for prefix in self._longest_first:
+            if text.startswith(prefix):
+                name, sep, rest = text[len(prefix) :].partition(" ")
+                if (command := self.commands.get(self._key(name))) is not None:
+                    return command, rest if sep else None
+
+    def _key(self, name: str) -> str:
+        return name.lower() if self.case_insensitive else name
+
+
+def _with_timeout(func: Callable, timeout: float) -> Callable:
+    import asyncio
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.wait_for(func(*args, **kwargs), timeout)
+
+    return wrapper
+
+
+_UNION_TYPES = (Union, getattr(types, "UnionType", Union))
+
+
+def _type_hints(func: Callable, annotations: dict) -> dict:
+    """
+    Annotations of func, resolved if they are strings (from __future__ import annotations).
+    Falls back to the raw annotations when a name can't be resolved, e.g. a local class.
+    """
+    try:
+        return typing.get_type_hints(func)
+    except Exception:
+        return annotations
+
+
+def _converter(annotation: Any) -> Union[Callable[[str], Any], None]:
+    """Converter for a parameter annotation, e.g. int or Optional[int]."""
+    if typing.get_origin(annotation) in _UNION_TYPES:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        annotation = args[0] if len(args) == 1 else None
+    if annotation in (int, float):
+        return annotation
+    if annotation is bool:
+        return lambda arg: arg.lower() in ("1", "true", "yes", "on", "y")
+    return None
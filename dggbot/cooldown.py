@@ -0,0 +1,97 @@
+"""
+Cooldowns for commands and event handlers, using monotonic time.
+"""
+
+import heapq
+import threading
+import time
+from typing import Callable, Hashable
+
+
+class BucketType:
+    USER = "user"  # each user has their own cooldown for the handler
+    COMMAND = "command"  # one cooldown for the handler, shared by everyone
+    GLOBAL = "global"  # one cooldown shared by every handler using this bucket
+
+
+class Cooldowns:
+    """
+    Keys that are on cooldown until they expire.
+    Expired keys are removed from a heap ordered by expiry time, so memory only
+    grows with the number of keys currently on cooldown.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._expiry: dict[Hashable, float] = {}
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(active={len(self)})"
+
+    def __len__(self):
+        with self._lock:
+            self._expire(self._clock())
+            return len(self._expiry)
+
+    def try_acquire(self, key: Hashable, duration: float) -> bool:
+        """Put the key on cooldown for duration seconds, unless it already is."""
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            if key in self._expiry:
+                return False
+            expires = now + duration
+            self._expiry[key] = expires
+            # The counter breaks ties, so keys never have to be compared.
+            heapq.heappush(self._heap, (expires, self._counter, key))
+            self._counter += 1
+            return True
+
+    def remaining(self, key: Hashable) -> float:
+        """Seconds left on the key's cooldown, 0 if it is not on cooldown."""
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            return max(0.0, self._expiry.get(key, now) - now)
+
+    def reset(self, key: Hashable):
+        with self._lock:
+            self._expiry.pop(key, None)
+
+    def _expire(self, now: float):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires, _, key = heapq.heappop(heap)
+            if self._expiry.get(key) == expires:
+                del self._expiry[key]
+
+
+def cooldown_check(
+    cooldowns: Cooldowns, func: Callable, duration: float, bucket: str
+) -> Callable[..., bool]:
+    """Returns a check that passes when the handler is off cooldown for the bucket."""
+    if bucket == BucketType.USER:
+
+        def key(msg=None, *_):
+            return func, getattr(msg, "nick_lower", None)
+
+    elif bucket == BucketType.COMMAND:
+
+        def key(*_):
+            return func
+
+    elif bucket == BucketType.GLOBAL:
+
+        def key(*_):
+            return BucketType.GLOBAL
+
+    else:
+        raise ValueError(f'Unknown cooldown bucket "{bucket}"')
+
+    def check(*args) -> bool:
+        return cooldowns.try_acquire(key(*args), duration)
+
+    return check
@@ -0,0 +1,142 @@
+"""
+Bounded worker pool used to run event handlers off the websocket thread.
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Hashable, Union
+
+from ._logging import _logger
+
+
+class Dispatcher:
+    """
+    Runs submitted jobs on a fixed number of worker threads fed by bounded queues.
+    :param workers: number of worker threads.
+    :param max_queue: maximum number of pending jobs (per worker when ordered).
+    :param ordered: jobs submitted with the same key run in submission order.
+    :param overflow: "block" to wait for room when the queue is full (a worker submitting
+        to its own full queue runs the job right away instead), "drop" to discard the job.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue: int = 1000,
+        *,
+        ordered: bool = False,
+        overflow: str = "block",
+        name: str = "dgg-dispatch",
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if overflow not in ("block", "drop"):
+            raise ValueError(f'Unknown overflow policy "{overflow}"')
+        self.workers = workers
+        self.ordered = ordered
+        self.overflow = overflow
+        self.name = name
+        self.dropped = 0
+        n_queues = workers if ordered else 1
+        self._queues = [queue.Queue(max_queue) for _ in range(n_queues)]
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()  # queue of the current worker thread
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(workers={self.workers}, "
+            f"ordered={self.ordered}, qsize={self.qsize()})"
+        )
+
+    @classmethod
+    def from_config(cls, config: Union[dict, None]) -> "Dispatcher":
+        """Create a dispatcher from the "dispatcher" section of a client config."""
+        config = config or dict()
+        return cls(
+            workers=config.get("workers", 4),
+            max_queue=config.get("maxQueue", 1000),
+            ordered=config.get("ordered", False),
+            overflow=config.get("overflow", "block"),
+        )
+
+    def qsize(self) -> int:
+        """Number of jobs waiting to be run."""
+        return sum(q.qsize() for q in self._queues)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                q = self._queues[i % len(self._queues)]
+                thread = threading.Thread(
+                    target=self._worker, args=(q,), name=f"{self.name}-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, wait: bool = True):
+        """Stop the workers once the jobs already queued have run."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for i in range(len(threads)):
+            self._queues[i % len(self._queues)].put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def submit(self, func: Callable, *args, key: Hashable = None, **kwargs) -> bool:
+        """
+        Queue func(*args, **kwargs) to be run by a worker.
+        :param key: when the dispatcher is ordered, jobs with the same key (e.g. a nick) run in order.
+        :return: False if the job was dropped because the queue was full.
+        """
+        if not self._threads:
+            self.start()
+        q = (
+            self._queues[hash(key) % len(self._queues)]
+            if self.ordered
+            else self._queues[0]
+        )
+        job = (func, args, kwargs)
+        if self.overflow == "drop":
+            try:
+                q.put_nowait(job)
+            except queue.Full:
+                self.dropped += 1
+                _logger.warning(f"Dispatcher queue full, dropping {_name(func)}.")
+                return False
+        elif getattr(self._local, "queue", None) is q:
+            # Submitted by a worker of that queue (e.g. a handler sending another
+            # event): waiting for room would block the thread that makes room.
+            try:
+                q.put_nowait(job)
+            except queue.Full:
+                self._run(func, args, kwargs)
+        else:
+            q.put(job)
+        return True
+
+    def _worker(self, q: queue.Queue):
+        self._local.queue = q
+        while True:
+            job = q.get()
+            if job is None:
+                return
+            self._run(*job)
+
+    @staticmethod
+    def _run(func: Callable, args: tuple, kwargs: dict):
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            _logger.exception(f"Unhandled exception in {_name(func)}")
+
+
+def _name(func: Any) -> str:
+    return getattr(func, "__qualname__", repr(func))
@@ -6,6 +6,10 @@ class Banned(Exception):
     pass
 
 
+class CommandBusy(Exception):
+    pass
+
+
 class DuplicateMessage(Exception):
     pass
 
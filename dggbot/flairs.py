@@ -1,7 +1,13 @@
 import dataclasses
-from typing import Union
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Callable, Union
+from urllib.parse import urlparse
 
-import requests
+from ._logging import _logger
 
 
 @dataclasses.dataclass
@@ -22,9 +28,11 @@ class Flair:
         return hash(self.name)
 
 
-def flair_converter(endpoint: str) -> dict:
+def flair_converter(endpoint: str, timeout: float = 10) -> dict:
     """Returns a dict to convert flair names (e.g. flair17) to a Flair object."""
-    r = requests.get(endpoint)
+    import requests
+
+    r = requests.get(endpoint, timeout=timeout)
     converter = {item["name"]: Flair(**item) for item in r.json()}
     return converter
 
@@ -33,3 +41,200 @@ def convert_flairs(flair_dict: dict, features: list = None) -> Union[list[Flair]
     """Converts a list of features into their corresponding Flairs, using a dict created from flair_converter."""
     if features:
         return [flair_dict[flair] for flair in features]
+
+
+def _default_cache_path(endpoint: Union[str, None]) -> str:
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    # One file per CDN, so e.g. destiny.gg and omniliberal flairs don't overwrite each other.
+    host = urlparse(endpoint or "").netloc
+    return os.path.join(
+        cache_dir, "dggbot", f"flairs-{host}.json" if host else "flairs.json"
+    )
+
+
+class FlairCatalog(dict):
+    """
+    Dict of flair names to Flairs, persisted to disk and revalidated with the CDN's ETag.
+    Loading reads the disk cache, and only waits for the CDN when there is no cache yet.
+    A stale cache is refreshed in the background, and unknown flairs return a
+    placeholder Flair and trigger a refresh instead of raising KeyError.
+    :param endpoint: url of flairs.json, None to never refresh.
+    :param flairs: initial flairs, e.g. from flair_converter.
+    :param path: file of the disk cache, None for ~/.cache/dggbot/flairs-<host>.json.
+    :param ttl: seconds before the cached flairs are revalidated.
+    :param timeout: timeout of the requests to the CDN.
+    :param min_interval: minimum seconds between refreshes caused by unknown flairs.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = None,
+        flairs: dict[str, Flair] = None,
+        *,
+        path: str = None,
+        ttl: float = 86400,
+        timeout: float = 10,
+        min_interval: float = 60,
+    ):
+        super().__init__(flairs or ())
+        self.endpoint = endpoint
+        self.path = path or _default_cache_path(endpoint)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.etag: str = None
+        self.fetched = 0.0  # time.time() of the last successful fetch or revalidation
+        # Weak references to the methods called after a refresh, see add_refresh_callback.
+        self.on_refresh: list[weakref.WeakMethod] = []
+        self._unknown: dict[str, Flair] = {}
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_attempt = float("-inf")
+
+    _shared: dict[tuple, "FlairCatalog"] = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, config: dict) -> "FlairCatalog":
+        """
+        Loaded catalogue for a config, shared by every client of the process that
+        uses the same flairs url and cache file.
+        """
+        cache_config = config.get("flairCache") or {}
+        key = (config.get("flairs"), cache_config.get("path"))
+        with cls._shared_lock:
+            if (catalog := cls._shared.get(key)) is None:
+                catalog = cls._shared[key] = cls.from_config(config)
+            return catalog
+
+    @classmethod
+    def from_config(cls, config: dict) -> "FlairCatalog":
+        """Loaded catalogue for the "flairs" url and "flairCache" section of a config."""
+        cache_config = config.get("flairCache") or {}
+        return cls(
+            config.get("flairs"),
+            path=cache_config.get("path"),
+            ttl=cache_config.get("ttl", 86400),
+            timeout=cache_config.get("timeout", 10),
+        ).load()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(flairs={len(self)}, etag={self.etag!r})"
+
+    def __missing__(self, name: str) -> Flair:
+        if (placeholder := self._unknown.get(name)) is None:
+            _logger.info(f"Unknown flair {name}, refreshing flairs.")
+            placeholder = Flair(name, name, "", True, 0, "", False, [])
+            self._unknown[name] = placeholder
+        # The refresh may replace _unknown before this returns.
+        self.refresh_async()
+        return placeholder
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.fetched >= self.ttl
+
+    def load(self) -> "FlairCatalog":
+        """Read the disk cache, then refresh in the background (or now if there is no cache)."""
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+            self._set(cached["flairs"])
+            self.etag = cached.get("etag")
+            self.fetched = cached.get("fetched", 0.0)
+        except FileNotFoundError:
+            self.refresh()
+            return self
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            _logger.warning(f"Could not read flair cache {self.path}: {err}")
+            self.refresh()
+            return self
+        if self.stale:
+            self.refresh_async(force=True)
+        return self
+
+    def refresh(self) -> bool:
+        """
+        Fetch flairs.json if it changed since the last fetch, and save it to disk.
+        :return: True if the flairs changed.
+        """
+        if self.endpoint is None:
+            return False
+        import requests
+
+        headers = {"If-None-Match": self.etag} if self.etag and self else {}
+        try:
+            r = requests.get(self.endpoint, headers=headers, timeout=self.timeout)
+            if r.status_code == 304:
+                self.fetched = time.time()
+                self._save(None)
+                return False
+            r.raise_for_status()
+            items = r.json()
+            self._set(items)
+        except (requests.RequestException, ValueError, TypeError) as err:
+            _logger.warning(f"Could not refresh flairs from {self.endpoint}: {err}")
+            return False
+        self.etag = r.headers.get("ETag")
+        self.fetched = time.time()
+        self._save(items)
+        for ref in self.on_refresh:
+            if (callback := ref()) is not None:
+                callback()
+        return True
+
+    def add_refresh_callback(self, method: Callable[[], None]):
+        """
+        Call a bound method after every refresh. Only a weak reference is kept, so the
+        shared catalogue doesn't keep the method's object (e.g. a client's caches) alive.
+        """
+        self.on_refresh = [ref for ref in self.on_refresh if ref() is not None]
+        self.on_refresh.append(weakref.WeakMethod(method))
+
+    def refresh_async(self, force: bool = False):
+        """Refresh in a background thread, unless a refresh is running or was just tried."""
+        with self._lock:
+            now = time.monotonic()
+            if self._refreshing or (
+                not force and now - self._last_attempt < self.min_interval
+            ):
+                return
+            self._refreshing = True
+            self._last_attempt = now
+        threading.Thread(
+            target=self._background_refresh, name="dggbot-flairs", daemon=True
+        ).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        finally:
+            self._refreshing = False
+
+    def _set(self, items: list[dict]):
+        flairs = {item["name"]: Flair(**item) for item in items}
+        # Update before removing, so lookups never see an empty catalogue.
+        self.update(flairs)
+        for name in self.keys() - flairs.keys():
+            del self[name]
+        self._unknown = {
+            name: flair for name, flair in self._unknown.items() if name not in flairs
+        }
+
+    def _save(self, items: Union[list[dict], None]):
+        """Write the cache file, items None only updates the etag and fetch time."""
+        try:
+            if items is None:
+                with open(self.path) as f:
+                    items = json.load(f)["flairs"]
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(
+                    {"etag": self.etag, "fetched": self.fetched, "flairs": items}, f
+                )
+            os.replace(tmp, self.path)
+        except (OSError, ValueError, KeyError) as err:
+            _logger.warning(f"Could not write flair cache {self.path}: {err}")
@@ -1,6 +1,7 @@
 """
 Shared functions and whatnot for different classes.
 """
+
 import threading
 
 
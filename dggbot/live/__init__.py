@@ -1,4 +1,3 @@
-import json
 from typing import Union
 
 from .._logging import _logger
@@ -18,9 +17,13 @@ class DGGLive(WSBase):
         wss: str = None,
         *,
         config: Union[str, dict[str, dict]] = None,
+        **kwargs,
     ):
         super().__init__(
-            wss, f"authtoken={auth_token}" if auth_token else None, config=config
+            wss,
+            f"authtoken={auth_token}" if auth_token else None,
+            config=config,
+            **kwargs,
         )
         self._live = False
 
@@ -39,8 +42,9 @@ class DGGLive(WSBase):
             self.on_event("stream_end")
 
     def _on_message(self, ws, message: str):
-        data = json.loads(message)
+        data = self.codec.loads(message)
         event_type = data["type"]
+        self._frames_received.inc(self.metrics_name, event_type)
         event_data = data
         if event_type == "dggApi:hosting":
             event_data = data["data"]
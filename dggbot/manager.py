@@ -0,0 +1,129 @@
+"""
+Runs several asyncio clients in one process, on one event loop.
+"""
+
+import asyncio
+from typing import Union
+
+from ._logging import _logger
+from .aio import AsyncClientMixin, LoopDispatcher, _in_loop
+from .metrics import MetricsRegistry
+from .wsbase import WSBase
+
+
+class ClientManager:
+    """
+    Runs asyncio clients (AsyncDGGChat, AsyncDGGBot, AsyncDGGLive...) on one event loop.
+    Each client only adds a socket: handlers run on the shared dispatcher, chats
+    with the same flairs url share one FlairCatalog, status() reports on all of them
+    and their metrics are in one registry, e.g. ``manager.metrics.serve(9100)``.
+
+    Example::
+
+        manager = ClientManager()
+        manager.add(AsyncDGGBot(token, config="configs/dggconfig.json"), "dgg")
+        manager.add(AsyncDGGBot(token, config="configs/omnilibconfig.json"), "omnilib")
+        manager.add(AsyncDGGLive(), "live")
+        manager.run()
+
+    :param dispatcher: dispatcher shared by the clients.
+    :param metrics: registry shared by the clients.
+    """
+
+    def __init__(
+        self, dispatcher: LoopDispatcher = None, metrics: MetricsRegistry = None
+    ):
+        self.dispatcher = dispatcher or LoopDispatcher()
+        self.metrics = metrics or MetricsRegistry()
+        self.clients: dict[str, WSBase] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._origins: dict[str, Union[str, None]] = {}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(clients={list(self.clients)})"
+
+    def __getitem__(self, name: str) -> WSBase:
+        return self.clients[name]
+
+    def add(self, client: AsyncClientMixin, name: str = None, origin: str = None):
+        """
+        Add a client, it is connected right away if the manager is running.
+        The client's handlers are moved to the manager's dispatcher, and its metrics
+        to the manager's registry, labelled with its name.
+        :param name: name of the client in status() and metrics, defaults to its url.
+        """
+        if not isinstance(client, AsyncClientMixin):
+            raise TypeError(
+                f"{type(client).__name__} is not an asyncio client, "
+                f"use e.g. AsyncDGGChat, AsyncDGGBot or AsyncDGGLive."
+            )
+        name = name or client.wss
+        if name in self.clients:
+            raise ValueError(f'A client named "{name}" already exists.')
+        client.dispatcher = self.dispatcher
+        client._unregister_metrics()
+        client.metrics, client.metrics_name = self.metrics, name
+        client._register_metrics()
+        self.clients[name] = client
+        self._origins[name] = origin
+        if self.dispatcher.running and _in_loop(self.dispatcher.loop):
+            self._start(name)
+        return client
+
+    async def remove(self, name: str):
+        """Close a client and stop managing it."""
+        client = self.clients.pop(name)
+        self._origins.pop(name, None)
+        await client.close()
+        if (task := self._tasks.pop(name, None)) is not None:
+            await asyncio.wait((task,))
+        client._unregister_metrics()
+
+    def status(self) -> dict[str, dict]:
+        """Connection state and counters of every client."""
+        return {
+            name: {
+                "state": client.state,
+                "uptime": client.uptime,
+                "connects": client.connects,
+                "reconnects": client.reconnects,
+                "lastError": client.last_error and type(client.last_error).__name__,
+            }
+            for name, client in self.clients.items()
+        }
+
+    # Run methods
+    async def run_forever(self):
+        """Runs every client (reconnecting them) until close() is called."""
+        self.dispatcher.start()
+        for name in self.clients:
+            if name not in self._tasks:
+                self._start(name)
+        while self._tasks:
+            await asyncio.wait(
+                tuple(self._tasks.values()), return_when=asyncio.FIRST_COMPLETED
+            )
+            for name, task in tuple(self._tasks.items()):
+                if task.done():
+                    del self._tasks[name]
+
+    def run(self):
+        """Blocking version of run_forever()."""
+        asyncio.run(self.run_forever())
+
+    async def close(self):
+        """Close every client, run_forever() returns once they are closed."""
+        await asyncio.gather(*(client.close() for client in self.clients.values()))
+        self.dispatcher.stop()
+
+    def _start(self, name: str):
+        task = self.dispatcher.loop.create_task(
+            self.clients[name].run_forever(self._origins[name]), name=name
+        )
+        task.add_done_callback(self._client_done)
+        self._tasks[name] = task
+
+    @staticmethod
+    def _client_done(task: asyncio.Task):
+        if not task.cancelled() and (err := task.exception()) is not None:
+            _logger.error(f"Client {task.get_name()} stopped", exc_info=err)
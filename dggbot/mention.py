@@ -0,0 +1,67 @@
+"""
+Mention detection for one or more names, compiled once into a single regex.
+"""
+
+import functools
+import re
+from typing import Iterable, Union
+
+
+class MentionMatcher:
+    """
+    Finds any of the given names (e.g. a bot's nick and its nicknames) as a whole word,
+    ignoring case, in a single pass over the text.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names = {}
+        self._regex: Union[re.Pattern, None] = None
+        self.add(*names)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self._names.values())})"
+
+    def __bool__(self):
+        return bool(self._names)
+
+    @property
+    def regex(self) -> Union[re.Pattern, None]:
+        return self._regex
+
+    @property
+    def names(self) -> tuple[str]:
+        return tuple(self._names.values())
+
+    def add(self, *names: str):
+        for name in names:
+            if name:
+                self._names[name.lower()] = name
+        self._compile()
+
+    def remove(self, *names: str):
+        for name in names:
+            self._names.pop(name.lower(), None)
+        self._compile()
+
+    def search(self, text: Union[str, None]) -> Union[str, None]:
+        """Returns the first name mentioned in the text, as it was written."""
+        if self._regex is not None and text and (match := self._regex.search(text)):
+            return match.group()
+
+    def is_mentioned(self, text: Union[str, None]) -> bool:
+        return self.search(text) is not None
+
+    def _compile(self):
+        if not self._names:
+            self._regex = None
+            return
+        # Longest names first, so "bot2" is not reported as "bot".
+        names = sorted(self._names, key=len, reverse=True)
+        alternation = "|".join(re.escape(name) for name in names)
+        self._regex = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=4096)
+def matcher_for(name: str) -> MentionMatcher:
+    """Shared matcher for a single name."""
+    return MentionMatcher((name,))
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import TYPE_CHECKING, Union
+from typing import TYPE_CHECKING, Any, Callable, Union
 
 from ._logging import _logger
-from .flairs import Flair, convert_flairs
+from .flairs import Flair
 from .user import User
 
 if TYPE_CHECKING:
@@ -30,14 +30,84 @@ def convert_timestamp(ts: Union[int, None]) -> Union[datetime, None]:
     return datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
 
 
+def _priority(priority: Union[int, None]) -> dict:
+    return {} if priority is None else {"priority": priority}
+
+
+class _Field:
+    """
+    Message attribute read from the raw message data when accessed.
+    Fields with a converter are converted on first access and cached in the "_<name>" slot.
+    """
+
+    __slots__ = ("key", "convert", "name", "slot")
+
+    def __init__(self, key: str, convert: Callable[[_MessageBase, Any], Any] = None):
+        self.key = key
+        self.convert = convert
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+        self.slot = f"_{name}"
+
+    def __get__(self, msg: _MessageBase, owner: type = None):
+        if msg is None:
+            return self
+        if self.convert is None:
+            return msg._data.get(self.key)
+        try:
+            return getattr(msg, self.slot)
+        except AttributeError:
+            value = self.convert(msg, msg._data.get(self.key))
+            setattr(msg, self.slot, value)
+            return value
+
+    def __set__(self, msg: _MessageBase, value: Any):
+        if self.convert is None:
+            msg._data[self.key] = value
+        else:
+            setattr(msg, self.slot, value)
+
+
+def _to_flairs(msg: _MessageBase, features: Union[list, None]):
+    return msg.chat.profiles.flairs(features)
+
+
+def _to_datetime(msg: _MessageBase, dt_string: Union[str, None]):
+    return convert_datetime(dt_string)
+
+
+def _to_created_date(msg: _MessageBase, dt_string: Union[str, None]):
+    return msg.chat.profiles.created_date(dt_string)
+
+
+def _to_timestamp(msg: _MessageBase, ts: Union[int, None]):
+    return convert_timestamp(ts)
+
+
 class _MessageBase:
+    __slots__ = ("chat", "type", "_data")
+    _fields: tuple[str] = ()
+
+    nick: str = _Field("nick")
+    watching: Union[None, dict] = _Field("watching")
+
     def __init__(self, chat: DGGChat, type_: str, data: dict):
         self.chat = chat
         self.type = type_
-        self.nick: str = data.get("nick")
-        self.watching: Union[None, dict] = data.get("watching")
         self._data = data
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = tuple(
+            dict.fromkeys(
+                name
+                for klass in reversed(cls.__mro__)
+                for name, value in vars(klass).items()
+                if isinstance(value, _Field)
+            )
+        )
+
     def get(self, key: str):
         return self._data.get(key)
 
@@ -50,116 +120,118 @@ class _MessageBase:
         _logger.debug(self)
 
     def __repr__(self):
+        attrs = {"chat": self.chat, "type": self.type}
+        attrs.update((name, getattr(self, name)) for name in self._fields)
         return (
             f"""{self.__class__.__name__}"""
-            + f"""({', '.join([f"{k}={repr(v)}" for k, v in self.__dict__.items() if k != '_data'])})"""
+            + f"""({', '.join([f"{k}={repr(v)}" for k, v in attrs.items()])})"""
         )
 
 
 class Message(_MessageBase):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.id: int = data.get("id")
-        self.features: list[Flair] = convert_flairs(chat._flairs, data.get("features"))
-        self.created_date = convert_datetime(data.get("createdDate"))
-        self.timestamp = convert_timestamp(data.get("timestamp"))
-        self.data: str = data.get("data")
+    __slots__ = ("_features", "_created_date", "_timestamp")
+
+    id: int = _Field("id")
+    features: tuple[Flair] = _Field("features", _to_flairs)
+    created_date: datetime = _Field("createdDate", _to_created_date)
+    timestamp: datetime = _Field("timestamp", _to_timestamp)
+    data: str = _Field("data")
 
     @property
     def user(self) -> User:
-        return User(self.id, self.nick, self.created_date, self.features)
+        return self.chat.profiles.user_from(self._data)
 
-    def reply(self, content):
-        self.chat.send(content)
+    def reply(self, content, priority: int = None):
+        self.chat.send(content, **_priority(priority))
 
 
 class MuteMessage(Message):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.duration: int = data.get("duration")
+    __slots__ = ()
+
+    duration: int = _Field("duration")
 
 
 class PrivateMessage(_MessageBase):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.message_id: int = data.get("messageid")
-        self.timestamp: datetime = convert_timestamp(data.get("timestamp"))
-        self.data: str = data.get("data")
+    __slots__ = ("_timestamp",)
+
+    message_id: int = _Field("messageid")
+    timestamp: datetime = _Field("timestamp", _to_timestamp)
+    data: str = _Field("data")
 
     @property
     def user(self) -> User:
         return self.chat.get_user(self.nick)
 
-    def reply(self, content):
-        self.chat.send_privmsg(self.nick, content)
+    def reply(self, content, priority: int = None):
+        self.chat.send_privmsg(self.nick, content, **_priority(priority))
 
 
 class PinnedMessage(Message):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.uuid: str = data.get("uuid")
+    __slots__ = ()
+
+    uuid: str = _Field("uuid")
 
 
 class BroadcastMessage(_MessageBase):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.data: str = data.get("data")
+    __slots__ = ()
+
+    data: str = _Field("data")
 
 
 class _SubMessageBase(_MessageBase):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.timestamp = convert_timestamp(data.get("timestamp"))
-        self.data: str = data.get("data")
-        self.tier: int = data.get("tier")
-        self.tier_label: str = data.get("tierLabel")
+    __slots__ = ("_timestamp",)
+
+    timestamp: datetime = _Field("timestamp", _to_timestamp)
+    data: str = _Field("data")
+    tier: int = _Field("tier")
+    tier_label: str = _Field("tierLabel")
 
 
 class SubscriptionMessage(_SubMessageBase):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.streak: int = data.get("streak")
+    __slots__ = ()
+
+    streak: int = _Field("streak")
 
 
 class MassGiftMessage(_SubMessageBase):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.quantity: int = data.get("quantity")
+    __slots__ = ()
+
+    quantity: int = _Field("quantity")
 
 
 class GiftSubMessage(_SubMessageBase):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.giftee: int = data.get("giftee")
+    __slots__ = ()
+
+    giftee: int = _Field("giftee")
 
 
 class DonationMessage(_MessageBase):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.timestamp = convert_timestamp(data.get("timestamp"))
-        self.data: str = data.get("data")
-        self.amount: int = data.get("amount")  # in US cents
+    __slots__ = ("_timestamp",)
+
+    timestamp: datetime = _Field("timestamp", _to_timestamp)
+    data: str = _Field("data")
+    amount: int = _Field("amount")  # in US cents
 
 
 class PollMessage(_MessageBase):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.can_vote: bool = data.get("canvote")
-        self.my_vote: int = data.get("myvote")
-        self.weighted: bool = data.get("weighted")
-        self.start: datetime = convert_datetime(data.get("start"))
-        self.now: datetime = convert_datetime(data.get("now"))
-        self.time: int = data.get("time")
-        self.question: str = data.get("question")
-        self.options: list[str] = data.get("options")
-        self.totals: list[int] = data.get("totals")
-        self.total_votes: int = data.get("totalvotes")
+    __slots__ = ("_start", "_now")
+
+    can_vote: bool = _Field("canvote")
+    my_vote: int = _Field("myvote")
+    weighted: bool = _Field("weighted")
+    start: datetime = _Field("start", _to_datetime)
+    now: datetime = _Field("now", _to_datetime)
+    time: int = _Field("time")
+    question: str = _Field("question")
+    options: list[str] = _Field("options")
+    totals: list[int] = _Field("totals")
+    total_votes: int = _Field("totalvotes")
 
     def vote(self, option: int):
         self.chat.cast_vote(option)
 
 
 class VoteMessage(_MessageBase):
-    def __init__(self, chat: DGGChat, type_: str, data: dict):
-        super().__init__(chat, type_, data)
-        self.vote: str = data.get("vote")
+    __slots__ = ()
+
+    vote: str = _Field("vote")
@@ -0,0 +1,328 @@
+"""
+Metrics of the clients: latency histograms (how far behind real time a client is,
+and where the time goes), and a registry of counters and gauges that can be read
+as a dict or served in the Prometheus text format.
+"""
+
+import bisect
+import threading
+from typing import Callable, Union
+
+# Upper bounds of the histogram buckets in seconds, from 10µs to about 10 minutes,
+# each 25% wider than the previous one.
+BUCKETS: tuple[float, ...] = tuple(1e-5 * 1.25**i for i in range(81))
+
+
+class Histogram:
+    """
+    Counts of values per bucket, so recording is O(1) in memory and time.
+    Percentiles are the upper bound of the bucket they fall in, i.e. within 25%.
+    """
+
+    __slots__ = ("counts", "count", "sum", "max", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(count={self.count}, p50={self.percentile(50)})"
+        )
+
+    def record(self, value: float):
+        value = max(value, 0.0)  # e.g. server timestamps ahead of the local clock
+        i = bisect.bisect_left(BUCKETS, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q: float) -> Union[float, None]:
+        """Value below which q percent of the recorded values fall, None if empty."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max if self.count else None,
+        }
+
+
+class LatencyStats:
+    """
+    Latency histograms of a client, per measurement and event (the lowercase event
+    type, as in on_msg), and per command for the commands an event ran:
+
+    - server_lag: server timestamp of a message -> frame received.
+    - dispatch_lag: frame received -> its handlers start, i.e. the dispatcher backlog.
+    - handler_time: time spent in the handlers of an event, or in a command.
+    - ping_rtt: websocket ping -> pong.
+
+    A growing server_lag with a steady dispatch_lag is the network (or the server),
+    a growing dispatch_lag is handlers that can't keep up.
+    """
+
+    SERVER_LAG = "server_lag"
+    DISPATCH_LAG = "dispatch_lag"
+    HANDLER_TIME = "handler_time"
+    PING_RTT = "ping_rtt"
+
+    def __init__(self):
+        # (measurement, event, command or "")
+        self._histograms: dict[tuple[str, str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(histograms={len(self._histograms)})"
+
+    def histogram(self, name: str, event: str, command: str = "") -> Histogram:
+        try:
+            return self._histograms[name, event, command]
+        except KeyError:
+            with self._lock:
+                return self._histograms.setdefault((name, event, command), Histogram())
+
+    def record(self, name: str, event: str, seconds: float, command: str = ""):
+        self.histogram(name, event, command).record(seconds)
+
+    def snapshot(self) -> dict[str, dict[str, dict[str, float]]]:
+        """{measurement: {event: {count, mean, p50, p90, p99, max}}}, in seconds."""
+        snapshot = {}
+        for (name, event, command), histogram in tuple(self._histograms.items()):
+            if not command:
+                snapshot.setdefault(name, {})[event] = histogram.summary()
+        return snapshot
+
+    def command_snapshot(self) -> dict[str, dict[str, dict[str, float]]]:
+        """{command: {measurement: {count, mean, p50, p90, p99, max}}}, in seconds."""
+        snapshot = {}
+        for (name, event, command), histogram in tuple(self._histograms.items()):
+            if command:
+                snapshot.setdefault(command, {})[name] = histogram.summary()
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+class Metric:
+    """
+    Counter or gauge, with one value per combination of label values.
+    Values are either updated (inc/set) or read from a function when collected (track).
+    :param kind: "counter" or "gauge".
+    """
+
+    def __init__(self, name: str, help_: str, kind: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_
+        self.kind = kind
+        self.labels = labels
+        self._values: dict[tuple, Union[float, Callable[[], float]]] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}<{self.kind} {self.name}>"
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def set(self, *label_values: str, value: float):
+        self._values[label_values] = value
+
+    def track(self, *label_values: str, func: Callable[[], float]):
+        """Read the value from func whenever the metric is collected."""
+        self._values[label_values] = func
+
+    def remove(self, **labels: str):
+        """Forget the values (and tracked functions) with these label values."""
+        positions = [
+            (self.labels.index(label), value)
+            for label, value in labels.items()
+            if label in self.labels
+        ]
+        if len(positions) < len(labels):
+            return
+        with self._lock:
+            for values in tuple(self._values):
+                if all(values[i] == value for i, value in positions):
+                    del self._values[values]
+
+    def collect(self) -> dict[tuple, float]:
+        return {
+            labels: value() if callable(value) else value
+            for labels, value in tuple(self._values.items())
+        }
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and latency histograms of one or more clients.
+    Clients add a "client" label to their metrics, so several clients can share a
+    registry, e.g. ``DGGBot(metrics=registry)``.
+    """
+
+    # Every 4th latency bucket (x2.44) is exposed to Prometheus, to keep scrapes small.
+    PROMETHEUS_BUCKETS = BUCKETS[::4]
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._latency: list[tuple[dict[str, str], LatencyStats]] = []
+        self._server = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(metrics={len(self._metrics)})"
+
+    def counter(self, name: str, help_: str, labels: tuple[str, ...] = ()) -> Metric:
+        return self._metric(name, help_, "counter", labels)
+
+    def gauge(self, name: str, help_: str, labels: tuple[str, ...] = ()) -> Metric:
+        return self._metric(name, help_, "gauge", labels)
+
+    def add_latency(self, stats: LatencyStats, **labels: str):
+        """Expose the histograms of a LatencyStats, with extra labels, e.g. client."""
+        self._latency.append((labels, stats))
+
+    def remove(self, **labels: str):
+        """
+        Forget every value and latency histogram with these label values, e.g.
+        ``remove(client="dgg")`` once a client is gone.
+        """
+        for metric in tuple(self._metrics.values()):
+            metric.remove(**labels)
+        with self._lock:
+            self._latency = [
+                (latency_labels, stats)
+                for latency_labels, stats in self._latency
+                if any(latency_labels.get(k) != v for k, v in labels.items())
+            ]
+
+    def snapshot(self) -> dict[str, Union[float, dict]]:
+        """
+        {metric: value} for metrics without labels, {metric: {label values: value}} otherwise.
+        Latency histograms are under "latency", as a list of (labels, LatencyStats.snapshot()).
+        """
+        snapshot = {}
+        for name, metric in tuple(self._metrics.items()):
+            values = metric.collect()
+            snapshot[name] = values.get((), 0) if not metric.labels else values
+        snapshot["latency"] = [
+            (labels, stats.snapshot()) for labels, stats in self._latency
+        ]
+        return snapshot
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, metric in tuple(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for values, value in metric.collect().items():
+                lines.append(
+                    f"{name}{_labels(zip(metric.labels, values))} {_number(value)}"
+                )
+        if self._latency:
+            name = "dggbot_latency_seconds"
+            lines.append(
+                f"# HELP {name} {LatencyStats.__doc__.strip().splitlines()[0]}"
+            )
+            lines.append(f"# TYPE {name} histogram")
+            for labels, stats in self._latency:
+                for key, histogram in tuple(stats._histograms.items()):
+                    measurement, event, command = key
+                    base = [
+                        *labels.items(),
+                        ("measurement", measurement),
+                        ("event", event),
+                    ]
+                    if command:
+                        base.append(("command", command))
+                    lines.extend(self._histogram_lines(name, base, histogram))
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """
+        Serve prometheus() over HTTP from a background thread, once per registry.
+        :return: the http.server.ThreadingHTTPServer, shutdown() stops it.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        with self._lock:
+            if self._server is None:
+                self._server = ThreadingHTTPServer((host, port), Handler)
+                threading.Thread(
+                    target=self._server.serve_forever,
+                    name="dggbot-metrics",
+                    daemon=True,
+                ).start()
+            return self._server
+
+    def _metric(self, name: str, help_: str, kind: str, labels: tuple) -> Metric:
+        with self._lock:
+            if (metric := self._metrics.get(name)) is None:
+                metric = self._metrics[name] = Metric(name, help_, kind, tuple(labels))
+            elif metric.kind != kind or metric.labels != tuple(labels):
+                raise ValueError(f'Metric "{name}" already exists with other labels.')
+            return metric
+
+    def _histogram_lines(self, name: str, labels: list, histogram: Histogram):
+        counts = histogram.counts
+        # Index in counts right after each exposed bucket, counts[i] is for BUCKETS[i].
+        cumulative, i = 0, 0
+        for bound in self.PROMETHEUS_BUCKETS:
+            while i < len(BUCKETS) and BUCKETS[i] <= bound:
+                cumulative += counts[i]
+                i += 1
+            yield f"{name}_bucket{_labels([*labels, ('le', _number(bound))])} {cumulative}"
+        yield f'{name}_bucket{_labels([*labels, ("le", "+Inf")])} {histogram.count}'
+        yield f"{name}_sum{_labels(labels)} {_number(histogram.sum)}"
+        yield f"{name}_count{_labels(labels)} {histogram.count}"
+
+
+def _labels(pairs) -> str:
+    pairs = list(pairs)
+    if not pairs:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
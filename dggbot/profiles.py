@@ -0,0 +1,70 @@
+"""
+Interning cache for the user profile data sent with every message.
+"""
+
+import functools
+from datetime import datetime
+from typing import Union
+
+from .flairs import Flair
+from .message import convert_datetime
+from .user import User
+
+
+class ProfileCache:
+    """
+    LRU caches that turn the raw nick/createdDate/features values of a user into
+    shared, immutable objects, so a chatter's profile is only decoded once.
+    :param flairs: dict of flair names to Flairs, e.g. a FlairCatalog.
+    :param maxsize: maximum number of users and dates kept.
+    """
+
+    def __init__(self, flairs: dict[str, Flair], maxsize: int = 20000):
+        self.flair_dict = flairs
+        self.maxsize = maxsize
+        self._flairs = functools.lru_cache(maxsize=1024)(self._convert_flairs)
+        self._dates = functools.lru_cache(maxsize=maxsize)(convert_datetime)
+        self._users = functools.lru_cache(maxsize=maxsize)(self._make_user)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(users={self._users.cache_info().currsize})"
+
+    def flairs(self, features: Union[list[str], None]) -> Union[tuple[Flair], None]:
+        """Converts a list of features into a shared tuple of Flairs."""
+        if features:
+            return self._flairs(tuple(features))
+
+    def created_date(self, dt_string: Union[str, None]) -> Union[datetime, None]:
+        if dt_string is not None:
+            return self._dates(dt_string)
+
+    def user(
+        self,
+        id_: int,
+        nick: str,
+        created_date: Union[str, None],
+        features: Union[list[str], None],
+    ) -> User:
+        """Returns the shared User for the raw values sent by the server."""
+        return self._users(id_, nick, created_date, tuple(features or ()))
+
+    def user_from(self, data: dict) -> User:
+        """Returns the shared User for a ME/NAMES/JOIN/MSG payload."""
+        return self.user(
+            data.get("id"),
+            data.get("nick"),
+            data.get("createdDate"),
+            data.get("features"),
+        )
+
+    def clear(self):
+        for cache in (self._flairs, self._dates, self._users):
+            cache.cache_clear()
+
+    def _convert_flairs(self, features: tuple[str]) -> tuple[Flair]:
+        return tuple(self.flair_dict[flair] for flair in features)
+
+    def _make_user(
+        self, id_: int, nick: str, created_date: Union[str, None], features: tuple
+    ) -> User:
+        return User(id_, nick, self.created_date(created_date), self.flairs(features))
@@ -0,0 +1,140 @@
+"""
+Token bucket used to pace outgoing chat messages below the server's throttle.
+"""
+
+import collections
+import threading
+import time
+from typing import Union
+
+
+class RateGovernor:
+    """
+    Token bucket that adapts its rate to the server's throttling.
+    Every Throttled error lowers the rate (and remembers the rate that got throttled
+    as a ceiling), and every quiet recovery_interval raises it again towards that ceiling.
+    The ceiling is forgotten after ceiling_reset seconds without throttling.
+    :param rate: messages per second, or None to start unlimited and learn the rate.
+        The first throttle then starts it at 1 / throttle_window at most.
+    :param burst: messages that can be sent back to back when the bucket is full.
+    :param backoff: rate multiplier applied when throttled.
+    :param recovery: rate multiplier applied after recovery_interval seconds without throttling.
+    :param min_rate: lowest rate and ceiling, in messages per second.
+    :param window: seconds of recent sends the throttled rate is measured over.
+    :param ceiling_reset: seconds without throttling after which the learned ceiling
+        goes back to the configured rate.
+    :param throttle_window: seconds the server wants between two messages.
+    """
+
+    def __init__(
+        self,
+        rate: Union[float, None] = None,
+        burst: int = 1,
+        *,
+        backoff: float = 0.5,
+        recovery: float = 1.1,
+        recovery_interval: float = 30.0,
+        min_rate: float = 0.05,
+        window: float = 10.0,
+        ceiling_reset: float = 600.0,
+        throttle_window: float = 0.3,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.backoff = backoff
+        self.recovery = recovery
+        self.recovery_interval = recovery_interval
+        self.min_rate = min_rate
+        self.window = window
+        self.ceiling_reset = ceiling_reset
+        self.throttle_window = throttle_window
+        self.ceiling = self._configured = rate
+        self.throttle_count = 0
+        self._tokens = float(burst)
+        self._updated = self._adjusted = self._throttled_at = time.monotonic()
+        self._recent = collections.deque(maxlen=10)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(rate={self.rate}, ceiling={self.ceiling})"
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RateGovernor":
+        """Create a governor from the "bot" section of a client config."""
+        rate = config.get("rateLimit")
+        if rate is None and (cooldown := config.get("sendMsgCooldown")):
+            rate = 1 / cooldown
+        return cls(
+            rate,
+            config.get("rateBurst", 1),
+            throttle_window=config.get("throttleWindow", 0.3),
+        )
+
+    def delay(self) -> float:
+        """Seconds to wait before the next message can be sent."""
+        with self._lock:
+            if self.rate is None:
+                return 0.0
+            self._refill(time.monotonic())
+            return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def consume(self, retry: bool = False):
+        """
+        Record that a message was sent.
+        :param retry: the message is sent again after being refused, it's left out of
+            the observed rate.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not retry:
+                self._recent.append(now)
+            if self.rate is None:
+                return
+            self._refill(now)
+            self._tokens -= 1
+            if now - self._adjusted >= self.recovery_interval:
+                if now - self._throttled_at >= self.ceiling_reset:
+                    self.ceiling = self._configured
+                self.rate = self.rate * self.recovery
+                if self.ceiling is not None:
+                    self.rate = min(self.rate, self.ceiling)
+                self._adjusted = now
+
+    def throttled(self, sent_at: float = None):
+        """
+        Lower the rate after the server replied with a Throttled error.
+        :param sent_at: time.monotonic() when the throttled message was sent. Messages
+            sent before the last backoff were already on their way, and don't lower it again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.throttle_count += 1
+            if sent_at is not None and sent_at < self._throttled_at:
+                return
+            observed = self._observed_rate(now)
+            if observed is not None:
+                observed = max(self.min_rate, observed)
+                self.ceiling = (
+                    observed if self.ceiling is None else min(self.ceiling, observed)
+                )
+            if self.rate is not None:
+                rate = self.rate * self.backoff
+            else:
+                # A burst can be thousands per second, start from the server's limit.
+                rate = 1 / self.throttle_window
+                if observed is not None:
+                    rate = min(rate, observed * self.backoff)
+            self.rate = max(self.min_rate, rate)
+            self._tokens = 0.0
+            self._updated = self._adjusted = self._throttled_at = now
+
+    def _observed_rate(self, now: float) -> Union[float, None]:
+        """Send rate over the last window seconds, None without enough recent sends."""
+        recent = [sent for sent in self._recent if now - sent <= self.window]
+        if len(recent) < 2 or recent[-1] == recent[0]:
+            return None
+        return (len(recent) - 1) / (recent[-1] - recent[0])
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
@@ -0,0 +1,88 @@
+"""
+Connection states and the reconnect backoff used by run_forever.
+"""
+
+import random
+from typing import Union
+
+
+class ConnectionState:
+    DISCONNECTED = "disconnected"  # not connected yet, or the connection was lost
+    CONNECTING = "connecting"  # handshake in progress
+    CONNECTED = "connected"
+    BACKOFF = "backoff"  # waiting before reconnecting
+    STOPPED = "stopped"  # run_forever returned, it won't reconnect
+
+
+class Backoff:
+    """
+    Exponential backoff with jitter, so clients that lost their connection at the
+    same time don't all reconnect at the same time.
+    :param base: delay (in seconds) after the first failure.
+    :param cap: maximum delay.
+    :param factor: how much the delay grows after each failure in a row.
+    :param jitter: fraction of the delay that is randomized, 0 for none.
+    :param hard_delay: delay after a hard error, e.g. TooManyConnections or Banned.
+    :param reset_after: seconds a connection must stay up to start over from base.
+    :param hard_errors: errors the server won't forgive quickly.
+    """
+
+    def __init__(
+        self,
+        base: float = 2.0,
+        cap: float = 120.0,
+        factor: float = 2.0,
+        jitter: float = 0.5,
+        hard_delay: float = 300.0,
+        reset_after: float = 60.0,
+        hard_errors: tuple[type, ...] = (),
+    ):
+        self.base = base
+        self.cap = cap
+        self.factor = factor
+        self.jitter = jitter
+        self.hard_delay = hard_delay
+        self.reset_after = reset_after
+        self.hard_errors = hard_errors
+        self.failures = 0
+
+    @classmethod
+    def from_config(
+        cls, config: Union[dict, None], hard_errors: tuple[type, ...] = ()
+    ) -> "Backoff":
+        """Backoff for the "connection" section of a config."""
+        config = config or {}
+        return cls(
+            base=config.get("backoffBase", 2.0),
+            cap=config.get("backoffCap", 120.0),
+            factor=config.get("backoffFactor", 2.0),
+            jitter=config.get("backoffJitter", 0.5),
+            hard_delay=config.get("hardBackoff", 300.0),
+            reset_after=config.get("resetAfter", 60.0),
+            hard_errors=hard_errors,
+        )
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(base={self.base}, cap={self.cap}, failures={self.failures})"
+
+    def is_hard(self, error: Union[BaseException, type, None]) -> bool:
+        if isinstance(error, type):
+            return issubclass(error, self.hard_errors)
+        return isinstance(error, self.hard_errors)
+
+    def delay(self, error: Union[BaseException, type, None] = None) -> float:
+        """Seconds to wait before the next attempt, counting one more failure."""
+        self.failures += 1
+        if self.is_hard(error):
+            delay = self.hard_delay
+        else:
+            delay = min(self.cap, self.base * self.factor ** (self.failures - 1))
+        return delay * (1 - self.jitter * random.random())
+
+    def connected_for(self, seconds: float):
+        """Start over from base once a connection stayed up long enough."""
+        if seconds >= self.reset_after:
+            self.failures = 0
+
+    def reset(self):
+        self.failures = 0
@@ -0,0 +1,170 @@
+"""
+Thread-safe roster of the users in chat, kept up to date by NAMES/JOIN/QUIT.
+"""
+
+import bisect
+import threading
+from datetime import datetime
+from types import MappingProxyType
+from typing import Iterable, Iterator, Mapping, Union
+
+from .flairs import Flair
+from .user import User
+
+
+class Roster:
+    """
+    Users in chat by lowercase nick.
+    Updates are serialized by a lock, and snapshot() hands out a read-only view
+    that is only copied when the roster changes while a snapshot is in use
+    (copy-on-write), so reading the users costs the same whatever the chat size.
+
+    Indexes by flair, account creation date and nick are updated along with the
+    users, so the queries below don't have to scan the whole chat.
+    """
+
+    def __init__(self, users: Iterable[User] = ()):
+        self._lock = threading.Lock()
+        self._shared = False
+        self._set(users)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(users={len(self)})"
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, nick: str) -> bool:
+        return nick.lower() in self._users
+
+    def __iter__(self) -> Iterator[User]:
+        return iter(self.snapshot().values())
+
+    def get(self, nick: str) -> Union[User, None]:
+        return self._users.get(nick.lower())
+
+    def snapshot(self) -> Mapping[str, User]:
+        """Read-only mapping of lowercase nicks to Users, unaffected by later updates."""
+        with self._lock:
+            self._shared = True
+            return MappingProxyType(self._users)
+
+    def add(self, user: User):
+        key = user.name.lower()
+        with self._lock:
+            if (old := self._users.get(key)) is not None:
+                self._unindex(key, old)
+            else:
+                bisect.insort(self._nicks, key)
+            self._writable()[key] = user
+            self._index(key, user)
+
+    def remove(self, nick: str) -> Union[User, None]:
+        key = nick.lower()
+        with self._lock:
+            if (user := self._users.get(key)) is None:
+                return None
+            self._unindex(key, user)
+            del self._nicks[bisect.bisect_left(self._nicks, key)]
+            return self._writable().pop(key)
+
+    def replace(self, users: Iterable[User]):
+        """Replace every user at once, e.g. with the NAMES list sent after connecting."""
+        new = Roster(users)
+        with self._lock:
+            self._users = new._users
+            self._by_flair = new._by_flair
+            self._by_created = new._by_created
+            self._nicks = new._nicks
+            self._shared = False
+
+    def clear(self):
+        self.replace(())
+
+    # Queries
+    def with_flair(self, *flairs: Union[str, Flair]) -> list[User]:
+        """Users with any of the flairs, e.g. with_flair("flair3", "flair8") for tier 3+ subs."""
+        with self._lock:
+            nicks = set().union(
+                *(self._by_flair.get(_flair_name(f), ()) for f in flairs)
+            )
+            return [self._users[nick] for nick in nicks]
+
+    def count_with_flair(self, *flairs: Union[str, Flair]) -> int:
+        with self._lock:
+            if len(flairs) == 1:
+                return len(self._by_flair.get(_flair_name(flairs[0]), ()))
+            return len(
+                set().union(*(self._by_flair.get(_flair_name(f), ()) for f in flairs))
+            )
+
+    def created_between(
+        self, start: datetime = None, end: datetime = None
+    ) -> list[User]:
+        """
+        Users whose account was created from start up to (excluding) end, oldest first.
+        Users without a creation date are never included.
+        """
+        with self._lock:
+            index = self._by_created
+            lo = 0 if start is None else bisect.bisect_left(index, (start,))
+            hi = len(index) if end is None else bisect.bisect_left(index, (end,))
+            return [self._users[nick] for _, nick in index[lo:hi]]
+
+    def created_after(self, start: datetime) -> list[User]:
+        """Users whose account was created at or after start, e.g. accounts under a week old."""
+        return self.created_between(start)
+
+    def complete(self, prefix: str, limit: int = None) -> list[str]:
+        """Lowercase nicks starting with prefix (case insensitive), in alphabetical order."""
+        prefix = prefix.lower()
+        with self._lock:
+            nicks = self._nicks
+            i = bisect.bisect_left(nicks, prefix)
+            found = []
+            while i < len(nicks) and nicks[i].startswith(prefix):
+                if limit is not None and len(found) >= limit:
+                    break
+                found.append(nicks[i])
+                i += 1
+            return found
+
+    def _set(self, users: Iterable[User]):
+        self._users: dict[str, User] = {user.name.lower(): user for user in users}
+        self._by_flair: dict[str, set[str]] = {}
+        self._by_created: list[tuple[datetime, str]] = []
+        self._nicks: list[str] = sorted(self._users)
+        for key, user in self._users.items():
+            for flair in user.features or ():
+                self._by_flair.setdefault(flair.name, set()).add(key)
+            if user.created_date is not None:
+                self._by_created.append((user.created_date, key))
+        self._by_created.sort()
+
+    def _index(self, key: str, user: User):
+        for flair in user.features or ():
+            self._by_flair.setdefault(flair.name, set()).add(key)
+        if user.created_date is not None:
+            bisect.insort(self._by_created, (user.created_date, key))
+
+    def _unindex(self, key: str, user: User):
+        for flair in user.features or ():
+            if (nicks := self._by_flair.get(flair.name)) is not None:
+                nicks.discard(key)
+                if not nicks:
+                    del self._by_flair[flair.name]
+        if user.created_date is not None:
+            entry = (user.created_date, key)
+            i = bisect.bisect_left(self._by_created, entry)
+            if i < len(self._by_created) and self._by_created[i] == entry:
+                del self._by_created[i]
+
+    def _writable(self) -> dict[str, User]:
+        if self._shared:
+            self._users = self._users.copy()
+            self._shared = False
+        return self._users
+
+
+def _flair_name(flair: Union[str, Flair]) -> str:
+    return flair if isinstance(flair, str) else flair.name
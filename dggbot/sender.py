@@ -0,0 +1,213 @@
+"""
+Outbound frame queue drained by a single writer thread.
+"""
+
+import collections
+import threading
+import time
+from typing import Callable, Hashable
+
+from ._logging import _logger
+from .ratelimit import RateGovernor
+
+
+class Priority:
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class _Frame:
+    __slots__ = ("frame", "key", "priority", "limited", "queued_at", "retry")
+
+    def __init__(
+        self,
+        frame: str,
+        key: Hashable,
+        priority: int,
+        limited: bool,
+        queued_at: float,
+    ):
+        self.frame = frame
+        self.key = key
+        self.priority = priority
+        self.limited = limited
+        self.queued_at = queued_at
+        self.retry = False  # written again after the server refused it
+
+
+class SendQueue:
+    """
+    Sends frames from one writer thread, highest priority lane first and in the
+    order they were queued within a lane.
+    Frames queued with a coalesce key replace a pending frame with the same key
+    instead of being sent twice (e.g. only the latest poll vote is sent).
+    Limited frames wait for the governor (if one is set) instead of being dropped, and
+    are kept until the server accepts or refuses them, so a throttled one is sent again.
+    :param write: function that writes a frame to the websocket.
+    :param ack_timeout: seconds after which a written limited frame the server didn't
+        answer is considered accepted.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[str], object],
+        *,
+        governor: RateGovernor = None,
+        ack_timeout: float = 5.0,
+        name: str = "dgg-send",
+    ):
+        self._write = write
+        self.governor = governor
+        self.ack_timeout = ack_timeout
+        self.name = name
+        self._lanes = tuple(collections.deque() for _ in range(Priority.LOW + 1))
+        # Refused frames to send again, in the order they were first written.
+        self._retries: collections.deque[_Frame] = collections.deque()
+        # (frame, time.monotonic() when written) of the limited frames not answered yet.
+        self._unacked: collections.deque[tuple[_Frame, float]] = collections.deque()
+        self._coalesce: dict[Hashable, _Frame] = {}
+        self._cond = threading.Condition()
+        self._thread: threading.Thread = None
+        self._writing = False
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.errors = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(qsize={self.qsize()}, sent={self.sent})"
+
+    def qsize(self) -> int:
+        """Number of frames waiting to be sent."""
+        return len(self._retries) + sum(len(lane) for lane in self._lanes)
+
+    @property
+    def unacked(self) -> int:
+        """Number of limited frames written that the server didn't answer yet."""
+        return len(self._unacked)
+
+    @property
+    def avg_latency(self) -> float:
+        """Average time (in seconds) frames spent in the queue."""
+        return self._total_latency / self.sent if self.sent else 0.0
+
+    def put(
+        self,
+        frame: str,
+        coalesce_key: Hashable = None,
+        *,
+        priority: int = Priority.NORMAL,
+        limited: bool = False,
+    ):
+        with self._cond:
+            if coalesce_key is not None and coalesce_key in self._coalesce:
+                self._coalesce[coalesce_key].frame = frame
+                self.coalesced += 1
+                return
+            item = _Frame(frame, coalesce_key, priority, limited, time.monotonic())
+            self._lanes[priority].append(item)
+            if coalesce_key is not None:
+                self._coalesce[coalesce_key] = item
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._writer, name=self.name, daemon=True
+                )
+                self._thread.start()
+            self._cond.notify_all()
+
+    def acknowledged(self, event_type: str) -> bool:
+        """
+        The server accepted the oldest unanswered frame of event_type, e.g. it echoed
+        our MSG or replied PRIVMSGSENT.
+        """
+        with self._cond:
+            self._expire(time.monotonic())
+            prefix = f"{event_type} "
+            for i, (item, _) in enumerate(self._unacked):
+                if item.frame.startswith(prefix):
+                    del self._unacked[i]
+                    return True
+            return False
+
+    def rejected(self, retry: bool = False, throttled: bool = False) -> bool:
+        """
+        The server refused the oldest unanswered frame with an ERR.
+        :param retry: send it again (e.g. after Throttled), after the frames refused
+            before it and ahead of every lane.
+        :param throttled: the ERR was Throttled, the governor slows down.
+        """
+        with self._cond:
+            self._expire(time.monotonic())
+            item, written = self._unacked.popleft() if self._unacked else (None, None)
+            if throttled and self.governor is not None:
+                # Before the frame is queued again, so it waits for the lowered rate.
+                self.governor.throttled(sent_at=written)
+            if item is None:
+                return False
+            if retry:
+                item.retry = True
+                self._retries.append(item)
+                self.retried += 1
+                self._cond.notify_all()
+            return True
+
+    def _expire(self, now: float):
+        while self._unacked and now - self._unacked[0][1] > self.ack_timeout:
+            self._unacked.popleft()
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until every queued frame has been written."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._writing and not self.qsize(), timeout
+            )
+
+    def _next(self) -> _Frame:
+        """Pop the next frame that can be written, waiting for the governor if needed."""
+        with self._cond:
+            while True:
+                self._cond.wait_for(self.qsize)
+                lane = self._retries or next(lane for lane in self._lanes if lane)
+                item = lane[0]
+                if item.limited:
+                    if self.governor is not None:
+                        if (delay := self.governor.delay()) > 0:
+                            # Wake up early if a higher priority frame is queued meanwhile.
+                            self._cond.wait(delay)
+                            continue
+                        self.governor.consume(retry=item.retry)
+                    # Tracked before it's written, the answer may come before write returns.
+                    now = time.monotonic()
+                    self._expire(now)
+                    self._unacked.append((item, now))
+                lane.popleft()
+                if item.key is not None and self._coalesce.get(item.key) is item:
+                    del self._coalesce[item.key]
+                self._writing = True
+                return item
+
+    def _writer(self):
+        while True:
+            item = self._next()
+            try:
+                self._write(item.frame)
+            except Exception as err:
+                self.errors += 1
+                _logger.error(f"Could not send frame {item.frame!r}: {err}")
+                with self._cond:
+                    self._unacked = collections.deque(
+                        entry for entry in self._unacked if entry[0] is not item
+                    )
+            else:
+                latency = time.monotonic() - item.queued_at
+                self.sent += 1
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+                self._total_latency += latency
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
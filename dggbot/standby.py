@@ -0,0 +1,125 @@
+"""
+Hot-standby connection: a second, read-only socket to the same chat whose frames are
+merged with the client's, so losing one socket doesn't lose any messages.
+"""
+
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import TYPE_CHECKING, Callable
+
+from ._logging import _logger
+from .reconnect import Backoff
+
+if TYPE_CHECKING:
+    from .wsbase import WSBase
+
+
+class FrameWindow:
+    """
+    Remembers the last frames received, to drop the copy of a frame from the other socket.
+    Frames are compared by the hash of the raw text (event type, nick, timestamp, data...).
+    :param size: number of frames remembered, it must cover how far behind a socket can lag.
+    """
+
+    def __init__(self, size: int = 4096):
+        self.size = size
+        self.duplicates = 0
+        self._seen: set[int] = set()
+        self._order: collections.deque[int] = collections.deque()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(size={self.size}, duplicates={self.duplicates})"
+        )
+
+    def first(self, frame: str) -> bool:
+        """True the first time a frame is seen within the window."""
+        key = hash(frame)
+        with self._lock:
+            if key in self._seen:
+                self.duplicates += 1
+                return False
+            self._seen.add(key)
+            self._order.append(key)
+            if len(self._order) > self.size:
+                self._seen.discard(self._order.popleft())
+            return True
+
+
+class Standby:
+    """
+    Read-only (no cookie) connection to the client's chat, reconnected in a background
+    thread with its own backoff. Its frames are handed to on_message like the client's.
+    """
+
+    def __init__(self, client: WSBase, on_message: Callable):
+        import websocket
+
+        self.client = client
+        self.ws = websocket.WebSocketApp(
+            client.wss,
+            on_open=self._on_open,
+            on_message=on_message,
+            on_error=self._on_error,
+            on_close=self._on_close,
+        )
+        self.backoff = Backoff.from_config(
+            client.config.get("connection"), client._hard_errors
+        )
+        self.connected = False
+        self.connects = 0
+        self.last_error: BaseException = None
+        self._connected_at: float = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(connected={self.connected})"
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="dggbot-standby", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.ws.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.last_error = None
+            self.ws.run_forever(
+                origin=self.client.config["wss-origin"],
+                ping_interval=self.client.ping_interval or 0,
+                ping_timeout=self.client.ping_timeout or None,
+                reconnect=0,
+            )
+            if self._stop.is_set():
+                break
+            delay = self.backoff.delay(self.last_error)
+            _logger.info(f"Standby disconnected, reconnecting in {delay:.1f} seconds.")
+            self._stop.wait(delay)
+
+    def _on_open(self, ws):
+        _logger.info(f"Standby connected to {self.client.wss}.")
+        self.connected = True
+        self.connects += 1
+        self._connected_at = time.monotonic()
+
+    def _on_error(self, ws, error):
+        self.last_error = error
+        _logger.warning(f"Standby {type(error).__name__}. Args: {error.args}")
+
+    def _on_close(self, ws, *_):
+        self.connected = False
+        if self._connected_at is not None:
+            self.backoff.connected_for(time.monotonic() - self._connected_at)
+            self._connected_at = None
@@ -0,0 +1,590 @@
+"""
+Local stand-in for DGG chat, to test and soak-test clients without the network:
+a websocket server speaking the chat protocol (NAMES, ME, synthetic MSG/JOIN/QUIT/
+PRIVMSG/POLLSTART traffic, ERR replies) that also serves flairs.json over HTTP.
+Only the standard library is used.
+
+Example::
+
+    with MockChatServer(users=20000, traffic=Traffic.peak(scale=10)) as server:
+        bot = DGGBot("token", config=server.config())
+        bot.run_forever()
+
+Usage: python -m dggbot.testing [--port 9998] [--users 5000] [--scale 10]
+"""
+
+import base64
+import collections
+import hashlib
+import heapq
+import json
+import math
+import random
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterator, Union
+
+from ._logging import _logger
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_TEXT, _CLOSE, _PING, _PONG = 0x1, 0x8, 0x9, 0xA
+
+FLAIRS = [
+    {
+        "label": label,
+        "name": name,
+        "description": "",
+        "hidden": False,
+        "priority": priority,
+        "color": color,
+        "rainbowColor": False,
+        "image": [],
+    }
+    for label, name, priority, color in (
+        ("Subscriber", "subscriber", 10, ""),
+        ("Subscriber Tier 1", "flair13", 9, "#488ce7"),
+        ("Subscriber Tier 2", "flair1", 8, "#488ce7"),
+        ("Subscriber Tier 3", "flair3", 7, "#0060ff"),
+        ("Subscriber Tier 4", "flair8", 6, "#a427d6"),
+        ("Twitch Subscriber", "flair9", 5, ""),
+        ("Bot", "bot", 1, "#e79015"),
+    )
+]
+MESSAGES = (
+    "PepeLaugh",
+    "is this real",
+    "OMEGALUL OMEGALUL OMEGALUL",
+    "!ping",
+    "MockBot what do you think?",
+    "https://www.destiny.gg/bigscreen",
+    "nice",
+    "> greentext",
+)
+
+
+class Traffic:
+    """
+    Synthetic chat traffic: events per second of each event type, and their shape.
+    :param rates: {event type: events per second}, e.g. {"MSG": 25, "JOIN": 3}.
+        MSG, JOIN, QUIT, PRIVMSG (to the authenticated connections) and POLLSTART
+        (followed by POLLSTOP) are generated.
+    :param shape: "steady" for evenly spaced events, "poisson" for random arrivals,
+        "burst" for random arrivals sent all at once every `period` seconds.
+    :param period: seconds between bursts.
+    :param messages: texts of the generated MSG and PRIVMSG.
+    :param seed: seed of the random arrivals and contents, for reproducible runs.
+    """
+
+    # Roughly the busiest minutes of destiny.gg chat.
+    PEAK = {"MSG": 25.0, "JOIN": 3.0, "QUIT": 3.0, "PRIVMSG": 0.2, "POLLSTART": 0.002}
+
+    def __init__(
+        self,
+        rates: dict[str, float],
+        shape: str = "poisson",
+        period: float = 1.0,
+        messages: tuple[str, ...] = MESSAGES,
+        seed: int = None,
+    ):
+        if shape not in ("steady", "poisson", "burst"):
+            raise ValueError(f'Unknown traffic shape "{shape}"')
+        self.rates = {event: rate for event, rate in rates.items() if rate > 0}
+        self.shape = shape
+        self.period = period
+        self.messages = messages
+        self.random = random.Random(seed)
+
+    @classmethod
+    def peak(cls, scale: float = 1.0, **kwargs) -> "Traffic":
+        """PEAK traffic, times scale."""
+        return cls({event: rate * scale for event, rate in cls.PEAK.items()}, **kwargs)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(rates={self.rates}, shape='{self.shape}')"
+
+    def schedule(self) -> Iterator[tuple[float, str]]:
+        """Endless (seconds from the start, event type), in order."""
+        arrivals = [(self._gap(rate), event) for event, rate in self.rates.items()]
+        heapq.heapify(arrivals)
+        while arrivals:
+            at, event = arrivals[0]
+            heapq.heapreplace(arrivals, (at + self._gap(self.rates[event]), event))
+            if self.shape == "burst":
+                at = math.ceil(at / self.period) * self.period
+            yield at, event
+
+    def _gap(self, rate: float) -> float:
+        if self.shape == "steady":
+            return 1 / rate
+        return self.random.expovariate(rate)
+
+
+class MockChatServer:
+    """
+    Websocket server on localhost that behaves like DGG chat:
+
+    - on connect, ME with the user of the authtoken or sid cookie (null without one),
+      then NAMES with the roster. Authenticated users JOIN the roster first.
+    - MSG and PRIVMSG from clients are broadcast or delivered, or answered with ERR
+      needlogin, throttled (faster than `throttle`), duplicate, invalidmsg or notfound.
+    - synthetic traffic from `traffic`, shared by every connection.
+    - GET /flairs.json (with ETag) on the same port, for the flair catalogue.
+
+    :param users: size of the roster sent in NAMES.
+    :param traffic: synthetic traffic, None for a quiet chat.
+    :param nick: nick of authenticated connections, e.g. the bot under test.
+    :param throttle: minimum seconds between two messages of a connection.
+    :param port: 0 for any free port, see url.
+    """
+
+    def __init__(
+        self,
+        users: int = 1000,
+        traffic: Traffic = None,
+        *,
+        nick: str = "MockBot",
+        throttle: float = 0.3,
+        flairs: list[dict] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = None,
+    ):
+        self.traffic = traffic
+        self.nick = nick
+        self.throttle = throttle
+        self.flairs = FLAIRS if flairs is None else flairs
+        self.random = random.Random(seed)
+        self.connections: set[_Connection] = set()
+        self.sent = 0  # frames sent, counting each connection
+        self.received: collections.deque[str] = collections.deque(maxlen=1000)
+        self._flairs_json = json.dumps(self.flairs).encode()
+        self._etag = f'"{hashlib.sha1(self._flairs_json).hexdigest()[:16]}"'
+        self._roster: dict[str, dict] = {}
+        self._nicks: list[str] = []  # for random picks, with their index below
+        self._index: dict[str, int] = {}
+        self._next_id = 0
+        for _ in range(users):
+            self._add_user(self._new_user())
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._cache_dir: tempfile.TemporaryDirectory = None
+        self._server = _Server((host, port), _Connection)
+        self._server.chat = self
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(url='{self.url}', users={len(self._roster)}, "
+            f"connections={len(self.connections)})"
+        )
+
+    def __enter__(self) -> "MockChatServer":
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/ws"
+
+    @property
+    def flairs_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/flairs.json"
+
+    @property
+    def users(self) -> int:
+        return len(self._roster)
+
+    def config(self, **sections) -> dict:
+        """Client config pointing to this server, with extra or replaced sections."""
+        if self._cache_dir is None:
+            self._cache_dir = tempfile.TemporaryDirectory(prefix="dggbot-mock-")
+        return {
+            "wss": self.url,
+            "wss-origin": "http://127.0.0.1",
+            "baseurl": f"http://127.0.0.1:{self.port}",
+            "endpoints": {"user": "/api/chat/me", "userinfo": "/api/userinfo"},
+            "flairs": self.flairs_url,
+            "flairCache": {"path": f"{self._cache_dir.name}/flairs.json"},
+            **sections,
+        }
+
+    def start(self):
+        threading.Thread(
+            target=self._server.serve_forever,
+            args=(0.05,),  # poll interval, so stop() is quick
+            name="dggbot-mock",
+            daemon=True,
+        ).start()
+        if self.traffic is not None:
+            threading.Thread(
+                target=self._generate, name="dggbot-mock-traffic", daemon=True
+            ).start()
+
+    def stop(self):
+        self._stop.set()
+        self._server.shutdown()
+        for connection in tuple(self.connections):
+            connection.close()
+        self._server.server_close()
+        if self._cache_dir is not None:
+            self._cache_dir.cleanup()
+
+    def broadcast(self, event_type: str, data: Union[dict, None]):
+        """Send a frame to every connection."""
+        frame = _encode(_TEXT, f"{event_type} {json.dumps(data)}".encode())
+        for connection in tuple(self.connections):
+            connection.write(frame)
+
+    # Roster
+    def _new_user(self, nick: str = None, features: list[str] = None) -> dict:
+        self._next_id += 1
+        created = datetime(2014, 1, 1) + (
+            datetime(2024, 1, 1) - datetime(2014, 1, 1)
+        ) * (self.random.random())
+        if features is None:
+            flairs = [flair["name"] for flair in self.flairs]
+            features = self.random.sample(flairs, self.random.randint(0, 2))
+        return {
+            "id": self._next_id,
+            "nick": nick or f"User{self._next_id}",
+            "features": features,
+            "createdDate": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+
+    def _add_user(self, user: dict):
+        if (nick := user["nick"]) not in self._roster:
+            self._index[nick] = len(self._nicks)
+            self._nicks.append(nick)
+        self._roster[nick] = user
+
+    def _remove_user(self, nick: str) -> Union[dict, None]:
+        if (user := self._roster.pop(nick, None)) is not None:
+            # Swap with the last nick, so removing is O(1).
+            i, last = self._index.pop(nick), self._nicks.pop()
+            if last != nick:
+                self._nicks[i] = last
+                self._index[last] = i
+        return user
+
+    def _random_user(self) -> dict:
+        return self._roster[self.random.choice(self._nicks)]
+
+    # Connections
+    def _connected(self, connection: "_Connection"):
+        with self._lock:
+            if connection.nick is not None:
+                user = self._roster.get(connection.nick)
+                if user is None:
+                    user = self._new_user(connection.nick, ["bot"])
+                    self._add_user(user)
+                    self.broadcast("JOIN", {**user, "timestamp": _now()})
+                connection.user = user
+            connection.send("ME", connection.user)
+            connection.send("NAMES", self._names())
+            self.connections.add(connection)
+
+    def _disconnected(self, connection: "_Connection"):
+        with self._lock:
+            self.connections.discard(connection)
+            nick = connection.nick
+            if nick is not None and all(c.nick != nick for c in self.connections):
+                if (user := self._remove_user(nick)) is not None:
+                    self.broadcast("QUIT", {**user, "timestamp": _now()})
+
+    def _names(self) -> dict:
+        return {
+            "connectioncount": len(self.connections) + 1,
+            "users": list(self._roster.values()),
+        }
+
+    def _on_frame(self, connection: "_Connection", text: str):
+        self.received.append(text)
+        event_type, _, payload = text.partition(" ")
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return connection.error("protocolerror")
+        if event_type == "MSG":
+            self._on_msg(connection, data)
+        elif event_type == "PRIVMSG":
+            self._on_privmsg(connection, data)
+        elif event_type == "CASTVOTE":
+            self.broadcast("VOTECAST", {"nick": connection.nick, "vote": data["vote"]})
+        else:
+            connection.error("protocolerror")
+
+    def _on_msg(self, connection: "_Connection", data: dict):
+        text = data.get("data") or ""
+        if connection.user is None:
+            return connection.error("needlogin")
+        if not text or len(text) > 512:
+            return connection.error("invalidmsg")
+        now = time.monotonic()
+        if now - connection.last_msg_at < self.throttle:
+            return connection.error("throttled")
+        if text == connection.last_msg:
+            return connection.error("duplicate")
+        connection.last_msg, connection.last_msg_at = text, now
+        self.broadcast("MSG", {**connection.user, "data": text, "timestamp": _now()})
+
+    def _on_privmsg(self, connection: "_Connection", data: dict):
+        if connection.user is None:
+            return connection.error("needlogin")
+        if data.get("nick") not in self._roster:
+            return connection.error("notfound")
+        connection.send("PRIVMSGSENT", {})
+        privmsg = self._privmsg(connection.nick, data["nick"], data.get("data", ""))
+        for other in tuple(self.connections):
+            if other.nick == data["nick"]:
+                other.send("PRIVMSG", privmsg)
+
+    def _privmsg(self, sender: str, target: str, text: str) -> dict:
+        self._next_id += 1
+        return {
+            "messageid": self._next_id,
+            "nick": sender,
+            "data": text,
+            "timestamp": _now(),
+        }
+
+    # Synthetic traffic
+    def _generate(self):
+        start = time.monotonic()
+        for at, event in self.traffic.schedule():
+            if (delay := start + at - time.monotonic()) > 0 and self._stop.wait(delay):
+                return
+            if self._stop.is_set():
+                return
+            try:
+                with self._lock:
+                    self._synthetic(event)
+            except Exception:
+                _logger.exception(f"Could not generate a {event} frame")
+
+    def _synthetic(self, event: str):
+        messages, rng = self.traffic.messages, self.traffic.random
+        if event == "MSG" and self._nicks:
+            user = self._random_user()
+            self.broadcast(
+                "MSG", {**user, "data": rng.choice(messages), "timestamp": _now()}
+            )
+        elif event == "JOIN":
+            user = self._new_user()
+            self._add_user(user)
+            self.broadcast("JOIN", {**user, "timestamp": _now()})
+        elif event == "QUIT" and self._nicks:
+            user = self._remove_user(self._random_user()["nick"])
+            self.broadcast("QUIT", {**user, "timestamp": _now()})
+        elif event == "PRIVMSG" and self._nicks:
+            sender = self._random_user()["nick"]
+            for connection in tuple(self.connections):
+                if connection.nick is not None:
+                    privmsg = self._privmsg(
+                        sender, connection.nick, rng.choice(messages)
+                    )
+                    connection.send("PRIVMSG", privmsg)
+        elif event == "POLLSTART":
+            self.broadcast("POLLSTART", self._poll(now=True))
+            timer = threading.Timer(5, self._end_poll)
+            timer.daemon = True
+            timer.start()
+
+    def _poll(self, now: bool) -> dict:
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        totals = [self.random.randint(0, 500) for _ in range(3)]
+        return {
+            "canvote": now,
+            "myvote": 0,
+            "nick": self._random_user()["nick"] if self._nicks else self.nick,
+            "weighted": False,
+            "start": timestamp,
+            "now": timestamp,
+            "time": 5000,
+            "question": "Is this real?",
+            "options": ["yes", "no", "maybe"],
+            "totals": totals if not now else [0, 0, 0],
+            "totalvotes": sum(totals) if not now else 0,
+        }
+
+    def _end_poll(self):
+        if not self._stop.is_set():
+            with self._lock:
+                self.broadcast("POLLSTOP", self._poll(now=False))
+
+    # HTTP
+    def _http(self, connection: "_Connection", path: str, headers: dict[str, str]):
+        if path.split("?")[0].rstrip("/").endswith("/flairs.json"):
+            if headers.get("if-none-match") == self._etag:
+                return connection.respond(304, b"", {"ETag": self._etag})
+            return connection.respond(
+                200,
+                self._flairs_json,
+                {"ETag": self._etag, "Content-Type": "application/json"},
+            )
+        connection.respond(404, b"Not Found", {"Content-Type": "text/plain"})
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    chat: MockChatServer
+
+
+class _Connection(socketserver.StreamRequestHandler):
+    """One HTTP request or websocket connection."""
+
+    server: _Server
+
+    def setup(self):
+        super().setup()
+        self.nick: str = None
+        self.user: dict = None
+        self.last_msg: str = None
+        self.last_msg_at = -math.inf
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+    def handle(self):
+        request = self.rfile.readline().decode("latin-1").split()
+        headers = {}
+        while (line := self.rfile.readline().strip()) != b"":
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if len(request) < 2:
+            return
+        chat = self.server.chat
+        if headers.get("upgrade", "").lower() != "websocket":
+            return chat._http(self, request[1], headers)
+        self._handshake(headers)
+        chat._connected(self)
+        try:
+            self._read_frames(chat)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            chat._disconnected(self)
+
+    def _handshake(self, headers: dict[str, str]):
+        accept = base64.b64encode(
+            hashlib.sha1((headers["sec-websocket-key"] + _GUID).encode()).digest()
+        )
+        self.wfile.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        cookies = dict(
+            cookie.strip().partition("=")[::2]
+            for cookie in headers.get("cookie", "").split(";")
+            if "=" in cookie
+        )
+        if cookies.get("authtoken") or cookies.get("sid"):
+            self.nick = self.server.chat.nick
+
+    def _read_frames(self, chat: MockChatServer):
+        while (frame := _read_frame(self.rfile)) is not None:
+            opcode, payload = frame
+            if opcode == _TEXT:
+                chat._on_frame(self, payload.decode())
+            elif opcode == _PING:
+                self.write(_encode(_PONG, payload))
+            elif opcode == _CLOSE:
+                self.write(_encode(_CLOSE, payload[:2]))
+                return
+
+    def send(self, event_type: str, data: Union[dict, None]):
+        self.write(_encode(_TEXT, f"{event_type} {json.dumps(data)}".encode()))
+
+    def error(self, description: str):
+        self.send("ERR", {"description": description})
+
+    def write(self, data: bytes):
+        with self._write_lock:
+            if self._closed:
+                return
+            try:
+                self.wfile.write(data)
+                self.server.chat.sent += 1
+            except OSError:
+                self._closed = True
+
+    def close(self):
+        with self._write_lock:
+            self._closed = True
+        try:
+            self.request.shutdown(2)
+        except OSError:
+            pass
+
+    def respond(self, status: int, body: bytes, headers: dict[str, str]):
+        reason = {200: "OK", 304: "Not Modified", 404: "Not Found"}[status]
+        head = [f"HTTP/1.1 {status} {reason}", f"Content-Length: {len(body)}"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        head += ["Connection: close", "", ""]
+        self.wfile.write("\r\n".join(head).encode() + body)
+
+
+def _encode(opcode: int, payload: bytes) -> bytes:
+    """Unmasked server frame, FIN set."""
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+def _read_frame(rfile) -> Union[tuple[int, bytes], None]:
+    """(opcode, payload) of the next client frame, None once the socket is closed."""
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None
+    opcode, n = head[0] & 0x0F, head[1] & 0x7F
+    if n == 126:
+        (n,) = struct.unpack("!H", rfile.read(2))
+    elif n == 127:
+        (n,) = struct.unpack("!Q", rfile.read(8))
+    mask = rfile.read(4) if head[1] & 0x80 else None
+    payload = rfile.read(n)
+    if mask and n:
+        key = int.from_bytes((mask * (n // 4 + 1))[:n], "big")
+        payload = (int.from_bytes(payload, "big") ^ key).to_bytes(n, "big")
+    return opcode, payload
+
+
+def _now() -> int:
+    return int(time.time() * 1000)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9998)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--scale", type=float, default=1.0, help="times peak traffic")
+    parser.add_argument("--shape", default="poisson")
+    parser.add_argument("--nick", default="MockBot")
+    args = parser.parse_args()
+    traffic = Traffic.peak(args.scale, shape=args.shape) if args.scale else None
+    with MockChatServer(args.users, traffic, nick=args.nick, port=args.port) as server:
+        print(f"Chat on {server.url}, flairs on {server.flairs_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Watchdog of the handlers and commands in flight: the ones running longer than a budget
+are logged with where they are stuck, and the slowest runs of each are kept.
+"""
+
+import heapq
+import sys
+import threading
+import time
+import traceback
+from typing import Union
+
+from ._logging import _logger
+
+
+class _Job:
+    __slots__ = ("name", "event", "start", "thread", "task", "reported")
+
+    def __init__(self, name: str, event: Union[str, None], start: float):
+        self.name = name
+        self.event = event
+        self.start = start
+        self.thread = threading.get_ident()
+        self.task = None  # asyncio task of an async handler, once it returned one
+        self.reported = False
+
+
+class HandlerStats:
+    """Runs of one handler: count, total and max seconds, and the slowest runs."""
+
+    __slots__ = ("count", "total", "max", "_slowest")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._slowest: list[tuple[float, str]] = []  # min-heap of (seconds, event)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(count={self.count}, max={self.max:.3f})"
+
+    def add(self, seconds: float, event: Union[str, None], keep: int):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if len(self._slowest) < keep:
+            heapq.heappush(self._slowest, (seconds, event or ""))
+        elif keep and seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, event or ""))
+
+    @property
+    def slowest(self) -> list[tuple[float, str]]:
+        """(seconds, event type) of the slowest runs, slowest first."""
+        return sorted(self._slowest, reverse=True)
+
+
+class Watchdog:
+    """
+    Tracks every handler and command invocation while it runs. A background thread
+    logs the ones over budget once, with the stack of the thread running it (or of
+    the asyncio task), so a handler stuck on I/O shows where it's stuck.
+    :param budget: seconds a handler may run before it's logged, None to never log.
+    :param keep: slowest runs kept per handler.
+    :param interval: seconds between checks, defaults to a quarter of the budget.
+    """
+
+    def __init__(
+        self, budget: Union[float, None] = 1.0, keep: int = 10, interval: float = None
+    ):
+        self.budget = budget
+        self.keep = keep
+        self.interval = interval or (budget / 4 if budget else None)
+        self.slow = 0  # invocations that went over budget
+        self._jobs: dict[_Job, None] = {}
+        self._stats: dict[str, HandlerStats] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread = None
+        self._stop: threading.Event = None
+
+    @classmethod
+    def from_config(cls, config: Union[dict, None]) -> "Watchdog":
+        """Watchdog for the "watchdog" section of a config."""
+        config = config or {}
+        return cls(
+            budget=config.get("budget", 1.0),
+            keep=config.get("slowest", 10),
+            interval=config.get("interval"),
+        )
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(budget={self.budget}, running={len(self._jobs)})"
+
+    @property
+    def running(self) -> int:
+        return len(self._jobs)
+
+    def begin(self, name: str, event: str = None, start: float = None) -> _Job:
+        """Start tracking an invocation, finish() must be called with what it returns."""
+        job = _Job(name, event, time.monotonic() if start is None else start)
+        self._jobs[job] = None
+        if self._thread is None and self.budget is not None:
+            self._start_thread()
+        return job
+
+    def finish(self, job: Union[_Job, None], result=None):
+        """
+        Stop tracking an invocation and record its time.
+        :param result: what the handler returned, if it's an asyncio task it's tracked
+            until it's done.
+        """
+        if job is None:
+            return
+        if hasattr(result, "add_done_callback"):
+            job.task = result
+            result.add_done_callback(lambda _: self.finish(job))
+            return
+        seconds = time.monotonic() - job.start
+        self._jobs.pop(job, None)
+        with self._lock:
+            if (stats := self._stats.get(job.name)) is None:
+                stats = self._stats[job.name] = HandlerStats()
+            stats.add(seconds, job.event, self.keep)
+        if job.reported:
+            _logger.info(f"Slow handler {job.name} finished after {seconds:.2f}s.")
+
+    def stats(self) -> dict[str, HandlerStats]:
+        """{handler name: HandlerStats}, slowest handlers first."""
+        with self._lock:
+            return dict(
+                sorted(self._stats.items(), key=lambda item: item[1].max, reverse=True)
+            )
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+        self.slow = 0
+
+    def check(self):
+        """Log the invocations that are over budget and weren't logged yet."""
+        if self.budget is None:
+            return
+        now = time.monotonic()
+        frames = None
+        for job in tuple(self._jobs):
+            if job.reported or now - job.start < self.budget:
+                continue
+            job.reported = True
+            self.slow += 1
+            if frames is None:
+                frames = sys._current_frames()
+            event = f" for {job.event}" if job.event else ""
+            _logger.warning(
+                f"Handler {job.name}{event} has been running for "
+                f"{now - job.start:.2f}s:\n{self._stack(job, frames)}"
+            )
+
+    def stop(self):
+        """Stop the background thread, it starts again with the next invocation."""
+        with self._lock:
+            if self._thread is not None:
+                self._stop.set()
+                self._thread = self._stop = None
+
+    def _start_thread(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._watch,
+                args=(self._stop,),
+                name="dggbot-watchdog",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _watch(self, stop: threading.Event):
+        while not stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                _logger.exception("Watchdog check failed")
+
+    @staticmethod
+    def _stack(job: _Job, frames: dict) -> str:
+        if job.task is not None and hasattr(job.task, "get_stack"):
+            stack = [(frame, frame.f_lineno) for frame in job.task.get_stack()]
+        elif (frame := frames.get(job.thread)) is not None:
+            # walk_stack goes from the innermost frame outwards
+            stack = reversed(list(traceback.walk_stack(frame)))
+        else:
+            return "  (no stack)\n"
+        return "".join(traceback.StackSummary.extract(stack).format())
@@ -1,12 +1,16 @@
+import collections
 import json
+import threading
 import time
 from abc import ABC, abstractmethod
 from typing import Callable, Union
 
-import websocket
-
 from ._logging import _logger
-from .funcs import threaded
+from .codec import get_codec
+from .dispatch import Dispatcher
+from .metrics import LatencyStats, MetricsRegistry
+from .reconnect import Backoff, ConnectionState
+from .watchdog import Watchdog
 
 
 class WSBase(ABC):
@@ -14,6 +18,8 @@ class WSBase(ABC):
         "wss": "wss://chat.destiny.gg/ws",
         "wss-origin": "https://www.destiny.gg",
     }
+    # Errors that make run_forever wait Backoff.hard_delay before reconnecting.
+    _hard_errors: tuple[type, ...] = ()
 
     def __init__(
         self,
@@ -21,8 +27,14 @@ class WSBase(ABC):
         cookie: str = None,
         *,
         config: Union[str, dict[str, dict]] = None,
+        dispatcher: Dispatcher = None,
+        metrics: MetricsRegistry = None,
         **kwargs,
     ):
+        """
+        :param dispatcher: dispatcher running the handlers, e.g. shared with other clients.
+        :param metrics: registry of the client's metrics, e.g. shared with other clients.
+        """
         if isinstance(config, str):
             with open(config) as f:
                 self.config = json.load(f)
@@ -30,7 +42,11 @@ class WSBase(ABC):
             self.config = config
         else:
             self.config = self._CONFIG
+        # websocket-client is imported when a client is made, so "import dggbot" stays quick.
+        import websocket
+
         self.wss = wss or self.config["wss"]
+        self.codec = get_codec(self.config.get("json", "auto"))
         self.ws = websocket.WebSocketApp(
             self.wss,
             cookie=cookie,
@@ -38,13 +54,93 @@ class WSBase(ABC):
             on_message=self._on_message,
             on_error=self._on_error,
             on_close=self._on_close,
+            on_pong=self._on_pong,
         )
         self._connected = False
+        connection_config = self.config.get("connection") or {}
+        self.backoff = Backoff.from_config(connection_config, self._hard_errors)
+        self.ping_interval = connection_config.get("pingInterval", 30)
+        self.ping_timeout = connection_config.get("pingTimeout", 10)
+        self.state = ConnectionState.DISCONNECTED
+        self.connects = 0  # successful connections
+        self.reconnects = 0  # reconnect attempts by run_forever
+        self.last_error: BaseException = None
+        self._connected_at: float = None
+        self._stop = threading.Event()
+        # (old, new, queued) state changes, delivered in order by _run_state_changes
+        self._state_changes: collections.deque[tuple] = collections.deque()
+        self._state_lock = threading.Lock()
+        self.latency = LatencyStats()
+        self.watchdog = Watchdog.from_config(self.config.get("watchdog"))
         self._events = {}
+        self.dispatcher = dispatcher or Dispatcher.from_config(
+            self.config.get("dispatcher")
+        )
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics_name = self.wss  # "client" label of the metrics
+        self._register_metrics()
+        if port := (self.config.get("metrics") or {}).get("port"):
+            try:
+                self.metrics.serve(port)
+            except OSError as err:
+                _logger.warning(f"Could not serve metrics on port {port}: {err}")
 
     def __repr__(self):
         return f"{self.__class__.__name__}()"
 
+    def _register_metrics(self):
+        """Add the client's metrics to self.metrics, labelled with metrics_name."""
+        client, metrics = self.metrics_name, self.metrics
+        self._frames_received = metrics.counter(
+            "dggbot_frames_received_total", "Frames received.", ("client", "event")
+        )
+        self._decode_errors = metrics.counter(
+            "dggbot_decode_errors_total", "Frames that weren't valid json.", ("client",)
+        )
+        self._decode_errors.inc(client, amount=0)
+        for name, help_, kind, func in (
+            ("connected", "1 while connected.", "gauge", lambda: int(self._connected)),
+            ("connects_total", "Connections opened.", "counter", lambda: self.connects),
+            (
+                "reconnects_total",
+                "Reconnect attempts.",
+                "counter",
+                lambda: self.reconnects,
+            ),
+            (
+                "handlers_running",
+                "Handlers and commands running.",
+                "gauge",
+                lambda: self.watchdog.running,
+            ),
+            (
+                "slow_handlers_total",
+                "Handlers and commands that ran over the watchdog's budget.",
+                "counter",
+                lambda: self.watchdog.slow,
+            ),
+            (
+                "dispatcher_queue_depth",
+                "Jobs waiting for the dispatcher.",
+                "gauge",
+                lambda: self.dispatcher.qsize(),
+            ),
+            (
+                "dispatcher_dropped_total",
+                "Jobs dropped because the dispatcher queue was full.",
+                "counter",
+                lambda: getattr(self.dispatcher, "dropped", 0),
+            ),
+        ):
+            # kind is the name of the registry method, counter or gauge
+            metric = getattr(metrics, kind)(f"dggbot_{name}", help_, ("client",))
+            metric.track(client, func=func)
+        metrics.add_latency(self.latency, client=client)
+
+    def _unregister_metrics(self):
+        """Remove the client's metrics from self.metrics, so it isn't kept alive by them."""
+        self.metrics.remove(client=self.metrics_name)
+
     # Event methods
     def event(self, event_name: str = None):
         """Decorator to run function when the specified event occurs."""
@@ -54,39 +150,178 @@ class WSBase(ABC):
             if event not in self._events:
                 self._events[event] = []
             self._events[event].append(func)
+            self._events_changed()
             return func
 
         return decorator
 
-    @threaded
+    def _events_changed(self):
+        """Do stuff after an event handler is added."""
+
     def on_event(self, event: str, *args, **kwargs):
-        for func in self._events.get(f"on_{event}", tuple()):
-            func(*args, **kwargs)
+        """Queue the handlers of the event to be run by the dispatcher."""
+        if funcs := self._events.get(f"on_{event}"):
+            key = getattr(args[0], "nick", None) if args else None
+            self.dispatcher.submit(
+                self._run_handlers,
+                funcs,
+                args,
+                kwargs,
+                event,
+                time.monotonic(),
+                key=key and key.lower(),
+            )
+
+    def _run_handlers(
+        self,
+        funcs: list,
+        args: tuple,
+        kwargs: dict,
+        event: str = None,
+        queued: float = None,
+    ):
+        """
+        :param event: event name the handler times are recorded for.
+        :param queued: time.monotonic() when the handlers were queued.
+        """
+        if queued is not None:
+            self.latency.record(
+                LatencyStats.DISPATCH_LAG, event, time.monotonic() - queued
+            )
+        for func in funcs:
+            try:
+                if self._checks_pass(func, *args):
+                    start = time.monotonic()
+                    job = self.watchdog.begin(_handler_name(func), event, start)
+                    result = None
+                    try:
+                        result = self._call_handler(func, *args, **kwargs)
+                    finally:
+                        self.watchdog.finish(job, result)
+                    if event is not None:
+                        self._record_handler_time(event, start, result)
+            except Exception:
+                _logger.exception(f"Unhandled exception in handler {func!r}")
+
+    def _record_handler_time(
+        self, event: str, start: float, result=None, command: str = ""
+    ):
+        """Record how long a handler took, once it's done if it returned an asyncio task."""
+        if hasattr(result, "add_done_callback"):
+            result.add_done_callback(
+                lambda _: self._record_handler_time(event, start, command=command)
+            )
+        else:
+            self.latency.record(
+                LatencyStats.HANDLER_TIME, event, time.monotonic() - start, command
+            )
+
+    @staticmethod
+    def _checks_pass(func: Callable, *args) -> bool:
+        """Runs the checks of a handler, then its cooldowns so failed checks don't start one."""
+        for check in getattr(func, "_perms", ()):
+            if not check(*args):
+                return False
+        for check in getattr(func, "_cooldowns", ()):
+            if not check(*args):
+                return False
+        return True
+
+    def _call_handler(self, func: Callable, *args, **kwargs):
+        """Call an event handler or command. Overridden by the asyncio clients."""
+        return func(*args, **kwargs)
+
+    # Connection state
+    @property
+    def uptime(self) -> float:
+        """Seconds since the current connection was opened, 0 when disconnected."""
+        if self._connected_at is None:
+            return 0.0
+        return time.monotonic() - self._connected_at
+
+    def _set_state(self, state: str):
+        if state != (old := self.state):
+            self.state = state
+            _logger.debug(f"Connection state: {old} -> {state}")
+            if "on_state_change" in self._events:
+                self._state_changes.append((old, state, time.monotonic()))
+                self.dispatcher.submit(self._run_state_changes, key="state_change")
+
+    def _run_state_changes(self):
+        """
+        Run the state_change handlers of the queued changes. Any worker may run it, the
+        lock makes sure the changes are delivered one at a time and in order.
+        """
+        with self._state_lock:
+            while self._state_changes:
+                old, state, queued = self._state_changes.popleft()
+                if funcs := self._events.get("on_state_change"):
+                    self._run_handlers(funcs, (old, state), {}, "state_change", queued)
+
+    def _on_connected(self):
+        self._connected = True
+        self._connected_at = time.monotonic()
+        self.connects += 1
+        self._set_state(ConnectionState.CONNECTED)
 
     # Run methods
     def run(self, origin: str = None):
-        self.ws.run_forever(origin=origin or self.config["wss-origin"])
+        self.last_error = None
+        self._set_state(ConnectionState.CONNECTING)
+        self.ws.run_forever(
+            origin=origin or self.config["wss-origin"],
+            ping_interval=self.ping_interval or 0,
+            ping_timeout=self.ping_timeout or None,
+            reconnect=0,
+        )
+
+    def run_forever(self, origin: str = None, sleep: float = None):
+        """
+        Runs the client until stop() is called, reconnecting with exponential backoff.
+        :param sleep: base delay before reconnecting, defaults to the "connection" config.
+        """
+        import websocket
 
-    def run_forever(self, origin: str = None, sleep: int = 2):
-        """Runs the client forever by automatically reconnecting the websocket."""
-        while True:
+        if sleep is not None:
+            self.backoff.base = sleep
+        self._stop.clear()
+        while not self._stop.is_set():
+            error = None
             try:
-                self.run(origin=origin or self.config["wss-origin"])
-            except websocket._exceptions.WebSocketConnectionClosedException as err:
-                _logger.info(
-                    f"WebSocketConnectionClosedException in run_forever: {err}. Reconnecting in {sleep} seconds."
-                )
+                self.run(origin=origin)
             except websocket.WebSocketException as err:
-                _logger.info(
-                    f"WebSocketException in run_forever: {err}. Reconnecting in {sleep} seconds."
-                )
+                error = err
                 self.ws.close()
             except Exception as err:
-                _logger.error(
-                    f"Unhandled exception in run_forever: {err}. Reconnecting in {sleep} seconds."
-                )
+                error = err
+                _logger.error(f"Unhandled exception in run_forever: {err}")
                 self.ws.close()
-            time.sleep(sleep)
+            if self._stop.is_set():
+                break
+            if not self._wait_to_reconnect(error or self.last_error):
+                break
+        self._set_state(ConnectionState.STOPPED)
+
+    def stop(self):
+        """Close the websocket and stop run_forever."""
+        self._stop.set()
+        self._on_stop()
+        self.ws.close()
+
+    def _on_stop(self):
+        """Do stuff when the client is stopped, e.g. close other connections."""
+
+    def _reconnect_delay(self, error: Union[BaseException, None]) -> float:
+        delay = self.backoff.delay(error)
+        self.reconnects += 1
+        reason = f" after {type(error).__name__}" if error is not None else ""
+        _logger.info(f"Disconnected{reason}. Reconnecting in {delay:.1f} seconds.")
+        self._set_state(ConnectionState.BACKOFF)
+        return delay
+
+    def _wait_to_reconnect(self, error: Union[BaseException, None]) -> bool:
+        """Sleeps before reconnecting, returns False if stop() was called meanwhile."""
+        return not self._stop.wait(self._reconnect_delay(error))
 
     # Websocket methods
     @abstractmethod
@@ -94,11 +329,28 @@ class WSBase(ABC):
 
     def _on_open(self, ws):
         _logger.info(f"Connecting to {self.wss}.")
-        self._connected = True
+        self._on_connected()
 
     def _on_error(self, ws, error):
+        self.last_error = error
+        if isinstance(error, self.codec.errors):
+            self._decode_errors.inc(self.metrics_name)
         _logger.error(f"{type(error).__name__}. Args: {error.args}")
 
+    def _on_pong(self, ws, data):
+        if ws.last_ping_tm:
+            self.latency.record(
+                LatencyStats.PING_RTT, "ws", ws.last_pong_tm - ws.last_ping_tm
+            )
+
     def _on_close(self, ws, *_):
         _logger.debug(f"Connection closed.")
         self._connected = False
+        if self._connected_at is not None:
+            self.backoff.connected_for(self.uptime)
+            self._connected_at = None
+        self._set_state(ConnectionState.DISCONNECTED)
+
+
+def _handler_name(func: Callable) -> str:
+    return getattr(func, "__qualname__", None) or repr(func)
@@ -0,0 +1,30 @@
+"""
+Example of the asyncio clients, where handlers and commands can be coroutines.
+Regular functions still work, but they run on the event loop so keep them quick.
+"""
+
+import asyncio
+
+from dggbot import AsyncDGGBot
+
+bot = AsyncDGGBot("AUTH_TOKEN", owner="Owner")
+
+
+@bot.command()
+async def slowping(msg):
+    """Await something (a database, an HTTP request...) without blocking other handlers."""
+    await asyncio.sleep(1)
+    msg.reply("Pong")
+
+
+@bot.event()
+async def on_msg(msg):
+    print(f"{msg.nick}: {msg.data}")
+
+
+async def main():
+    await bot.run_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
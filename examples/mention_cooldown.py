@@ -1,22 +1,30 @@
 """
-Example on how to implement a cooldown for non-commands, like mentions.
+Example on how to use cooldowns for non-commands, like mentions.
 Inspiration from https://github.com/tenacious210/dggpt
 """
-import time
 
-from dggbot import DGGBot
+from dggbot import BucketType, DGGBot
 
 bot = DGGBot("AUTH_TOKEN", owner="OWNER")
-cooldown = 60  # seconds
 
 
 @bot.mention()
+@bot.cooldown(60, BucketType.USER)
 def on_mention(msg):
-    if bot._last_msg is not None:
-        if time.time() - bot._last_msg[1] < cooldown:
-            print("On cooldown")
-            return
+    """Replies at most once a minute to each user."""
     # run your code
 
 
+@bot.mention()
+@bot.cooldown(5, BucketType.GLOBAL)
+def shared(msg):
+    """Handlers in the GLOBAL bucket share one cooldown."""
+
+
+# Commands can use the same buckets, the default is one cooldown for everyone.
+@bot.command(cooldown=10, cooldown_bucket=BucketType.USER)
+def ping(msg):
+    msg.reply("Pong")
+
+
 bot.run_forever()
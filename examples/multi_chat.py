@@ -0,0 +1,29 @@
+"""
+Example of one process running bots in two chats and the live feed on one event loop.
+"""
+
+from dggbot import AsyncDGGBot, AsyncDGGLive, ClientManager
+
+manager = ClientManager()
+dgg = manager.add(AsyncDGGBot("AUTH_TOKEN", config="configs/dggconfig.json"), "dgg")
+omnilib = manager.add(
+    AsyncDGGBot("AUTH_TOKEN", config="configs/omnilibconfig.json"), "omnilib"
+)
+live = manager.add(AsyncDGGLive(), "live")
+
+
+@live.event()
+def on_stream_start():
+    dgg.send("Destiny is live!")
+
+
+@dgg.command()
+@omnilib.command()
+def status(msg):
+    """Registered on both bots, the reply goes to the chat the command came from."""
+    states = ", ".join(f"{name}: {s['state']}" for name, s in manager.status().items())
+    msg.reply(states)
+
+
+if __name__ == "__main__":
+    manager.run()
@@ -0,0 +1,23 @@
+"""
+Archiving chat at wire speed: frames are handed over before any json decoding,
+and decode=False skips building users/messages altogether.
+standby=True keeps a second socket open, so reconnects don't leave gaps in the archive.
+"""
+
+from dggbot import DGGChat
+
+# no auth_token is needed when you only need to read chat
+chat = DGGChat(decode=False, standby=True)
+
+
+@chat.raw()
+def archive(event_type: str, payload: str, received: float):
+    """
+    Runs once for every frame, on the thread of the socket that got it first.
+    payload is the raw json string.
+    """
+    if event_type == "MSG":
+        print(f"{received:.3f} {payload}")  # write to a file or database instead
+
+
+chat.run_forever()
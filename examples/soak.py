@@ -0,0 +1,31 @@
+"""
+Example of soak-testing a bot against a local stand-in of the chat, at 10 times the
+peak traffic, then printing how far behind it fell and its slowest handlers.
+"""
+
+import threading
+import time
+
+from dggbot import DGGBot
+from dggbot.testing import MockChatServer, Traffic
+
+with MockChatServer(users=20000, traffic=Traffic.peak(scale=10)) as server:
+    bot = DGGBot("AUTH_TOKEN", config=server.config())
+
+    @bot.command()
+    def ping(msg):
+        msg.reply("pong")
+
+    threading.Thread(target=bot.run_forever, daemon=True).start()
+    time.sleep(60)
+    bot.stop()
+    bot.dispatcher.stop()
+
+for measurement, events in bot.latency.snapshot().items():
+    for event, stats in events.items():
+        print(f"{measurement:<14} {event:<14} p50={stats['p50']} p99={stats['p99']}")
+for command, measurements in bot.latency.command_snapshot().items():
+    for measurement, stats in measurements.items():
+        print(f"{measurement:<14} !{command:<13} p50={stats['p50']} p99={stats['p99']}")
+for name, stats in bot.watchdog.stats().items():
+    print(f"{name:<30} runs={stats.count} max={stats.max:.3f}s")
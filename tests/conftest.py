@@ -0,0 +1,31 @@
+import pytest
+
+from dggbot import DGGBot, DGGChat
+from dggbot.flairs import Flair, FlairCatalog
+
+FLAIRS = {
+    name: Flair(label, name, "", False, priority, "", False, [])
+    for label, name, priority in (
+        ("Subscriber", "subscriber", 10),
+        ("Subscriber Tier 1", "flair13", 9),
+        ("Subscriber Tier 2", "flair1", 8),
+        ("Subscriber Tier 3", "flair3", 7),
+        ("Subscriber Tier 4", "flair8", 6),
+    )
+}
+
+
+@pytest.fixture(autouse=True)
+def offline_flairs(monkeypatch):
+    catalog = FlairCatalog(flairs=FLAIRS)
+    monkeypatch.setattr(FlairCatalog, "shared", lambda config: catalog)
+
+
+@pytest.fixture
+def chat():
+    return DGGChat()
+
+
+@pytest.fixture
+def bot():
+    return DGGBot(owner="Owner")
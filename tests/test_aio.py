@@ -0,0 +1,80 @@
+import asyncio
+
+from dggbot.aio import AsyncDGGBot, AsyncDGGChat
+
+
+def test_async_handlers():
+    chat = AsyncDGGChat()
+    results = []
+
+    @chat.event()
+    async def on_msg(msg):
+        await asyncio.sleep(0)
+        results.append(("async", msg.data))
+
+    @chat.event("on_msg")
+    def sync_handler(msg):
+        results.append(("sync", msg.data))
+
+    async def main():
+        chat.dispatcher.start()
+        chat._on_message(None, 'MSG {"nick": "Fritz", "data": "hi", "timestamp": 0}')
+        await asyncio.sleep(0.01)
+        assert chat.dispatcher.qsize() == 0
+
+    asyncio.run(main())
+    assert results == [("sync", "hi"), ("async", "hi")]
+
+
+def test_async_commands():
+    bot = AsyncDGGBot()
+
+    @bot.command()
+    async def echo(msg, arg):
+        calls.append(arg)
+
+    calls = []
+
+    async def main():
+        bot.dispatcher.start()
+        bot._on_message(
+            None, 'MSG {"nick": "Fritz", "data": "!echo hello there", "timestamp": 0}'
+        )
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert calls == ["hello there"]
+
+
+def test_async_command_timeout_and_concurrency():
+    bot = AsyncDGGBot()
+    calls = []
+
+    @bot.command(max_concurrency=1, timeout=0.05)
+    async def slow(msg, arg):
+        calls.append(arg)
+        await asyncio.sleep(1 if arg == "first" else 0)
+
+    async def main():
+        bot.dispatcher.start()
+        for arg in ("first", "second"):
+            bot._on_message(
+                None, f'MSG {{"nick": "Fritz", "data": "!slow {arg}", "timestamp": 0}}'
+            )
+        await asyncio.sleep(0.01)
+        assert calls == ["first"]  # "second" waits for the slot
+        await asyncio.sleep(0.1)  # "first" is cancelled after its timeout
+
+    asyncio.run(main())
+    assert calls == ["first", "second"]
+    assert bot.router.get("slow").running == 0
+
+
+def test_close_before_connect():
+    chat = AsyncDGGChat()
+
+    async def main():
+        chat._closed = asyncio.get_running_loop().create_future()
+        await asyncio.wait_for(chat.close(), 1)
+
+    asyncio.run(main())
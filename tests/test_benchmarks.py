@@ -0,0 +1,15 @@
+from benchmarks import suite
+
+
+def test_compare_flags_regressions_only():
+    baseline = {"fast": 10.0, "slow": 10.0, "removed": 1.0}
+    results = {"fast": 8.0, "slow": 13.0, "new": 5.0}
+    assert suite.compare(results, baseline, threshold=0.25) == ["slow"]
+    assert suite.compare(results, baseline, threshold=0.5) == []
+
+
+def test_benchmarks_run():
+    big = {"on_names.20k", "on_names.50k", "memory.roster_20k"}
+    results = suite.run([name for name in suite.BENCHMARKS if name not in big], True)
+    assert all(value > 0 for value in results.values())
+    assert results["memory.messages_10k"] > 10000 * 100  # bytes, kept alive
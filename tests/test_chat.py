@@ -1,35 +1,35 @@
 """
 Checks and tests for the following:
- - Connecting to DGG chat
+ - Connecting to DGG chat (a local stand-in, see dggbot.testing)
  - (more to come whenever I think of more)
 """
 
 import threading
-import time
 
 from dggbot import DGGChat
-
-checks = {"connection": False}
+from dggbot.testing import MockChatServer
 
 
 class TestChat(DGGChat):
-    def _on_open(self, ws):
-        super()._on_open(ws)
-        checks["connection"] = True
-
-
-chat = TestChat()
-
+    __test__ = False  # not a pytest test class
 
-# Test connection
-t = threading.Thread(target=chat.run)
-t.start()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened = threading.Event()
 
-
-# Close
-time.sleep(5)
-chat.ws.close()
-
-
-for check, result in checks.items():
-    print(f"{check}:", "SUCCESS" if result else "FAILURE")
+    def _on_open(self, ws):
+        super()._on_open(ws)
+        self.opened.set()
+
+
+def test_connection():
+    with MockChatServer(users=10) as server:
+        chat = TestChat(config=server.config())
+        t = threading.Thread(target=chat.run)
+        t.start()
+        try:
+            assert chat.opened.wait(5)
+        finally:
+            chat.ws.close()
+            t.join(5)
+            chat.dispatcher.stop()
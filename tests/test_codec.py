@@ -0,0 +1,23 @@
+import pytest
+
+from dggbot import DGGChat
+from dggbot.codec import BACKENDS, get_codec
+
+PAYLOAD = {"nick": "Fritz", "data": "héllo PepoG", "features": ["flair13"], "id": 1}
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_roundtrip(name):
+    pytest.importorskip(name)
+    codec = get_codec(name)
+    encoded = codec.dumps(PAYLOAD)
+    assert isinstance(encoded, str)
+    assert codec.loads(encoded) == PAYLOAD
+
+
+def test_selected_through_config():
+    chat = DGGChat(config={**DGGChat._CONFIG, "json": "json"})
+    assert chat.codec.name == "json"
+    assert get_codec("auto").name in BACKENDS
+    with pytest.raises(ValueError):
+        get_codec("yaml")
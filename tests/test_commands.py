@@ -0,0 +1,176 @@
+import threading
+from typing import Optional
+
+import pytest
+
+from dggbot import BucketType, DGGBot
+from dggbot.commands import Saturation
+from dggbot.cooldown import Cooldowns
+from dggbot.errors import CommandBusy
+from dggbot.message import Message
+
+
+def run(bot, text, nick="Fritz"):
+    msg = Message(bot, "MSG", {"nick": nick, "data": text, "timestamp": 0})
+    if bot.is_command(msg):
+        bot.on_command(msg)
+
+
+def test_argument_splitting(bot):
+    calls = []
+
+    @bot.command()
+    def say(msg, arg: str):
+        calls.append(("say", arg))
+
+    @bot.command(["log"])
+    def logs(msg, username: Optional[str] = None, *_):
+        calls.append(("logs", username, _))
+
+    @bot.command()
+    def ping(msg):
+        calls.append(("ping",))
+
+    run(bot, "!say hello there chat")
+    run(bot, "!log Fritz and the rest")
+    run(bot, "!logs")
+    run(bot, "!ping pong")
+    run(bot, "!unknown")
+    assert calls == [
+        ("say", "hello there chat"),
+        ("logs", "Fritz", ("and the rest",)),
+        ("logs", None, ()),
+        ("ping",),
+    ]
+
+
+def test_prefixes_case_and_converters():
+    bot = DGGBot(prefix=("!", "$"), case_insensitive=True)
+    calls = []
+
+    @bot.command()
+    def roll(msg, sides: int, times: Optional[int] = None):
+        calls.append((sides, times))
+
+    @bot.event()
+    def on_command_error(msg, err):
+        calls.append(type(err))
+
+    with pytest.raises(Exception):
+        bot.command(["ROLL"])(lambda msg: None)
+    run(bot, "!roll 6")
+    run(bot, "$ROLL 20 3")
+    run(bot, "!Roll six")
+    bot.dispatcher.stop()
+    assert calls == [(6, None), (20, 3), ValueError]
+
+    assert bot.prefix == ("!", "$")
+    bot.prefix = "~"  # changed after construction
+    run(bot, "!roll 4")
+    run(bot, "~roll 8")
+    assert calls[3:] == [(8, None)] and bot.router.prefixes == ("~",)
+
+
+def test_checks_added_after_registration(bot):
+    calls = []
+
+    @bot.check(lambda msg: msg.nick == "Cake")
+    @bot.command()
+    def cake(msg):
+        calls.append(msg.nick)
+
+    run(bot, "!cake", nick="Fritz")
+    run(bot, "!cake", nick="Cake")
+    assert calls == ["Cake"]
+
+
+def test_cooldown_expiry():
+    now = [0.0]
+    cooldowns = Cooldowns(clock=lambda: now[0])
+    assert cooldowns.try_acquire("a", 0.5)
+    assert not cooldowns.try_acquire("a", 0.5)
+    assert cooldowns.remaining("a") == 0.5
+    for i in range(1000):
+        cooldowns.try_acquire(i, 1)
+    now[0] = 0.6
+    assert cooldowns.try_acquire("a", 0.5)
+    now[0] = 2
+    assert len(cooldowns) == 0 and not cooldowns._heap
+
+
+def test_cooldown_buckets(bot):
+    calls = []
+
+    @bot.command(cooldown=60, cooldown_bucket=BucketType.USER)
+    def hi(msg):
+        calls.append(("hi", msg.nick))
+
+    @bot.command(cooldown=60)
+    def shared(msg):
+        calls.append(("shared", msg.nick))
+
+    for nick in ("Fritz", "Cake", "Fritz"):
+        run(bot, "!hi", nick=nick)
+        run(bot, "!shared", nick=nick)
+    assert calls == [("hi", "Fritz"), ("shared", "Fritz"), ("hi", "Cake")]
+
+
+def test_event_handlers_use_checks_and_cooldowns(bot):
+    calls = []
+
+    @bot.event()
+    @bot.cooldown(60, BucketType.GLOBAL)
+    @bot.check(lambda msg: msg.nick != "Spammer")
+    def on_msg(msg):
+        calls.append(msg.nick)
+
+    for nick in ("Spammer", "Fritz", "Cake"):
+        bot._run_handlers(
+            bot._events["on_msg"], (Message(bot, "MSG", {"nick": nick}),), {}
+        )
+    assert calls == ["Fritz"]
+
+
+def test_commands_run_off_receive_thread(bot):
+    ran = threading.Event()
+    threads = []
+
+    @bot.command()
+    def slow(msg):
+        threads.append(threading.current_thread())
+        ran.wait(1)
+
+    bot._post_message(Message(bot, "MSG", {"nick": "Fritz", "data": "!slow"}))
+    ran.set()  # _post_message returned while the command was still waiting
+    bot.dispatcher.stop()
+    assert threads and threads[0] is not threading.current_thread()
+
+
+def test_max_concurrency_saturation(bot):
+    calls = []
+
+    @bot.event()
+    def on_command_error(msg, err):
+        calls.append(type(err))
+
+    def command(policy):
+        def func(msg, n: int):
+            calls.append((policy, n))
+            if n == 1:  # invoked again while this one holds the only slot
+                run(bot, f"!{policy} 2")
+
+        func.__name__ = policy
+        return func
+
+    for policy in (Saturation.QUEUE, Saturation.DROP, Saturation.REJECT):
+        bot.command(max_concurrency=1, saturation=policy)(command(policy))
+        run(bot, f"!{policy} 1")
+    bot.dispatcher.stop()
+    assert calls == [
+        ("queue", 1),
+        ("queue", 2),
+        ("drop", 1),
+        ("reject", 1),
+        CommandBusy,
+    ]
+    assert all(command.running == 0 for command in bot._commands.values())
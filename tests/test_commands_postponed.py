@@ -0,0 +1,23 @@
+"""Commands defined in a module with postponed annotations (PEP 563)."""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from dggbot import DGGBot
+from dggbot.message import Message
+
+
+def test_converters_with_string_annotations():
+    bot = DGGBot()
+    calls = []
+
+    @bot.command()
+    def roll(msg, sides: int, times: Optional[int] = None, loud: bool = False):
+        calls.append((sides, times, loud))
+
+    assert roll.__annotations__["sides"] == "int"
+    msg = Message(bot, "MSG", {"nick": "Fritz", "data": "!roll 6 2 yes"})
+    bot.on_command(msg)
+    bot.dispatcher.stop()
+    assert calls == [(6, 2, True)]
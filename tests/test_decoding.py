@@ -0,0 +1,123 @@
+import json
+
+from dggbot import DGGChat
+from dggbot.message import Message
+
+JOIN = 'JOIN {"nick": "Fritz", "features": ["flair13"], "createdDate": "2020-01-01T00:00:00Z", "timestamp": 0}'
+QUIT = 'QUIT {"nick": "Fritz", "timestamp": 0}'
+MSG = 'MSG {"nick": "Fritz", "features": [], "data": "hi", "timestamp": 0}'
+
+
+def test_unsubscribed_frames_are_not_decoded(chat):
+    decoded = []
+    chat._dispatch_message = decoded.append
+
+    @chat.event()
+    def on_msg(msg):
+        pass
+
+    chat._on_message(None, JOIN)
+    assert decoded == []
+    assert chat.get_user("fritz").features[0].label == "Subscriber Tier 1"
+    chat._on_message(None, MSG)
+    assert [msg.data for msg in decoded] == ["hi"]
+    chat._on_message(None, QUIT)
+    chat._on_message(None, 'PIN {"nick": "Fritz", "data": "pinned"}')
+    assert len(decoded) == 1 and chat.get_user("fritz") is None
+
+
+def test_subscribing_decodes(chat):
+    decoded = []
+    chat._dispatch_message = decoded.append
+    chat._on_message(None, JOIN)
+
+    @chat.event("on_join")
+    def joined(msg):
+        pass
+
+    chat._on_message(None, JOIN)
+    assert [type(msg).__name__ for msg in decoded] == ["Message"]
+
+
+def test_bot_always_decodes_chat_messages(bot):
+    decoded = []
+    bot._dispatch_message = decoded.append
+    bot._on_message(None, MSG)
+    bot._on_message(None, 'PRIVMSG {"nick": "Fritz", "data": "hey", "messageid": 1}')
+    assert [type(msg).__name__ for msg in decoded] == ["Message", "PrivateMessage"]
+
+
+def test_post_message_override_decodes_chat_messages():
+    class Logger(DGGChat):
+        def _post_message(self, msg):
+            logged.append(msg.data)
+
+    logged = []
+    chat = Logger()
+    chat._on_message(None, MSG)
+    chat._on_message(None, JOIN)
+    assert logged == ["hi"]
+
+
+def test_messages_decode_fields_lazily(chat):
+    data = {
+        "nick": "Fritz",
+        "features": ["flair13"],
+        "createdDate": "2020-01-01T00:00:00.123Z",
+        "timestamp": 1700000000000,
+        "data": "hi",
+    }
+    msg = Message(chat, "MSG", data)
+    assert not hasattr(msg, "__dict__")
+    assert not hasattr(msg, "_created_date")
+    assert msg.created_date.year == 2020 and msg._created_date is msg.created_date
+    assert msg.features[0].name == "flair13"
+    assert msg.timestamp.year == 2023
+    msg.data = "edited"
+    assert msg.data == msg.get("data") == "edited"
+    assert "nick='Fritz'" in repr(msg) and "features=(Flair<" in repr(msg)
+
+
+def test_profiles_are_shared(chat):
+    chat._on_message(None, JOIN)
+    joined = chat.get_user("fritz")
+    data = json.loads(JOIN.split(maxsplit=1)[1])
+    msg = Message(chat, "MSG", data)
+    assert msg.user is joined
+    assert msg.features is joined.features and isinstance(joined.features, tuple)
+    assert msg.created_date is joined.created_date
+    chat.on_names(1, [data])
+    assert chat.get_user("fritz") is joined
+
+
+def test_raw_tap_without_decoding(chat):
+    frames = []
+    decoded = []
+    chat.decode = False
+    chat._dispatch_message = decoded.append
+    chat.raw()(lambda *frame: frames.append(frame))
+
+    @chat.event()
+    def on_msg(msg):
+        pass
+
+    chat._on_message(None, MSG)
+    chat._on_message(None, 'NAMES {"connectioncount": 0, "users": []}')
+    assert [frame[:2] for frame in frames] == [
+        ("MSG", MSG.split(maxsplit=1)[1]),
+        ("NAMES", '{"connectioncount": 0, "users": []}'),
+    ]
+    assert isinstance(frames[0][2], float)
+    assert decoded == []
+
+
+def test_mentions(chat):
+    chat.add_mention_alias("FritzBot", "fritz_02")
+    chat._on_message(None, 'ME {"id": 1, "nick": "Bot9000", "features": []}')
+    assert set(chat.mentions.names) == {"Bot9000", "FritzBot", "fritz_02"}
+    assert chat.mentions.search("hi bot9000!") == "bot9000"
+    assert chat.mentions.search("hey @FritzBot") == "FritzBot"
+    assert chat.mentions.search("FRITZ_02 PepoG") == "FRITZ_02"
+    assert not chat.mentions.is_mentioned("fritzbot2 is not me")
+    assert chat.is_mentioned(Message(chat, "MSG", {"data": "Bot9000?"}))
+    assert chat.user.is_mentioned(Message(chat, "MSG", {"data": "Bot9000?"}))
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from dggbot.dispatch import Dispatcher
+
+
+def test_ordered_keys_run_in_order():
+    dispatcher = Dispatcher(workers=4, ordered=True)
+    seen = {"a": [], "b": []}
+    for i in range(200):
+        key = "ab"[i % 2]
+        dispatcher.submit(seen[key].append, i, key=key)
+    dispatcher.stop()
+    assert seen["a"] == list(range(0, 200, 2))
+    assert seen["b"] == list(range(1, 200, 2))
+
+
+def test_drop_when_full():
+    dispatcher = Dispatcher(workers=1, max_queue=1, overflow="drop")
+    release = threading.Event()
+    dispatcher.submit(release.wait)
+    time.sleep(0.05)  # let the worker pick up the blocking job
+    assert dispatcher.submit(lambda: None)
+    assert not dispatcher.submit(lambda: None)
+    assert dispatcher.dropped == 1
+    assert dispatcher.qsize() == 1
+    release.set()
+    dispatcher.stop()
+
+
+def test_worker_submitting_to_its_full_queue():
+    dispatcher = Dispatcher(workers=1, max_queue=1, ordered=True)
+    ran, done = [], threading.Event()
+
+    def handler():
+        # e.g. on_names sending another event, with its own queue already full
+        for i in range(3):
+            dispatcher.submit(ran.append, i, key="fritz")
+        done.set()
+
+    dispatcher.submit(handler, key="fritz")
+    assert done.wait(1)
+    dispatcher.stop()
+    assert sorted(ran) == [0, 1, 2]
+
+
+def test_on_event_uses_dispatcher(chat):
+    done = threading.Event()
+    calls = []
+
+    @chat.event()
+    def on_broadcast(msg):
+        calls.append(msg)
+        raise ValueError("handler errors are logged, not raised")
+
+    @chat.event("on_broadcast")
+    def second(msg):
+        done.set()
+
+    chat._on_message(None, 'BROADCAST {"data": "hello", "timestamp": 0}')
+    assert done.wait(1)
+    assert calls[0].data == "hello"
+    assert chat.dispatcher.running
@@ -0,0 +1,124 @@
+import gc
+import json
+import threading
+import weakref
+
+import pytest
+
+from dggbot import DGGChat
+from dggbot.flairs import FlairCatalog
+
+ITEM = {
+    "label": "Subscriber Tier 3",
+    "name": "flair3",
+    "description": "",
+    "hidden": False,
+    "priority": 7,
+    "color": "",
+    "rainbowColor": False,
+    "image": [],
+}
+
+
+class FakeCDN:
+    def __init__(self, items, etag='"v1"'):
+        self.items = items
+        self.etag = etag
+        self.requests = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def get(self, url, headers=None, timeout=None):
+        self.gate.wait(1)
+        self.requests.append(headers or {})
+        if (headers or {}).get("If-None-Match") == self.etag:
+            return FakeResponse(304, None, {})
+        return FakeResponse(200, self.items, {"ETag": self.etag})
+
+
+class FakeResponse:
+    def __init__(self, status_code, data, headers):
+        self.status_code = status_code
+        self._data = data
+        self.headers = headers
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+@pytest.fixture
+def cdn(monkeypatch):
+    cdn = FakeCDN([ITEM])
+    monkeypatch.setattr("requests.get", cdn.get)
+    return cdn
+
+
+def test_disk_cache_and_revalidation(tmp_path, cdn):
+    path = str(tmp_path / "flairs.json")
+    catalog = FlairCatalog("cdn", path=path).load()
+    assert catalog["flair3"].label == "Subscriber Tier 3" and len(cdn.requests) == 1
+
+    cached = FlairCatalog("cdn", path=path).load()  # from disk, no request
+    assert cached.etag == '"v1"' and "flair3" in cached and len(cdn.requests) == 1
+
+    stale = FlairCatalog("cdn", path=path, ttl=0)
+    stale.load()
+    assert "flair3" in stale  # usable right away while it revalidates
+    stale.refresh()
+    assert cdn.requests[-1] == {"If-None-Match": '"v1"'}
+    with open(path) as f:
+        assert json.load(f)["flairs"] == [ITEM]
+
+
+def test_unknown_flair_refreshes_once(tmp_path, cdn):
+    catalog = FlairCatalog("cdn", path=str(tmp_path / "flairs.json"))
+    refreshed = threading.Event()
+    catalog.add_refresh_callback(refreshed.set)
+    cdn.gate.clear()
+    placeholders = {catalog["flair3"].name for _ in range(10)}
+    assert placeholders == {"flair3"} and catalog.get("flair3") is None
+    cdn.gate.set()
+    assert refreshed.wait(1)
+    assert len(cdn.requests) == 1 and catalog["flair3"].priority == 7
+
+
+def test_catalogue_shared_per_flairs_url(tmp_path, cdn, monkeypatch):
+    monkeypatch.undo()  # the real FlairCatalog.shared, not the one of conftest
+    monkeypatch.setattr(FlairCatalog, "_shared", {})
+    monkeypatch.setattr("requests.get", cdn.get)
+
+    def config(host):
+        return {
+            "flairs": f"https://{host}/flairs.json",
+            "flairCache": {"path": str(tmp_path / f"{host}.json")},
+        }
+
+    dgg = FlairCatalog.shared(config("cdn.destiny.gg"))
+    assert FlairCatalog.shared(config("cdn.destiny.gg")) is dgg
+    omnilib = FlairCatalog.shared(config("cdn.omniliberal.dev"))
+    assert omnilib is not dgg and omnilib.endpoint.startswith("https://cdn.omni")
+    assert len(cdn.requests) == 2 and dgg["flair3"].priority == 7
+
+
+def test_cache_file_per_cdn():
+    dgg = FlairCatalog("https://cdn.destiny.gg/flairs/flairs.json")
+    omnilib = FlairCatalog("https://cdn.omniliberal.dev/flairs/flairs.json")
+    assert dgg.path.endswith("flairs-cdn.destiny.gg.json") and dgg.path != omnilib.path
+
+
+def test_refresh_callbacks_dont_keep_clients_alive(tmp_path, cdn, monkeypatch):
+    catalog = FlairCatalog("cdn", path=str(tmp_path / "flairs.json"))
+    monkeypatch.setattr(FlairCatalog, "shared", lambda config: catalog)
+    chat = DGGChat()
+    chat.profiles.user_from({"nick": "Fritz", "features": []})
+    catalog.refresh()
+    assert chat.profiles._users.cache_info().currsize == 0  # cleared by the refresh
+    profiles = weakref.ref(chat.profiles)
+    del chat
+    gc.collect()
+    assert profiles() is None
+    other = DGGChat()
+    assert [ref() for ref in catalog.on_refresh] == [other.profiles.clear]
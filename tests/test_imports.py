@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+
+import dggbot
+
+
+def test_import_is_lazy():
+    code = (
+        "import sys, dggbot; "
+        "print(sorted({'requests', 'websocket', 'asyncio', 'dggbot.chat'} & set(sys.modules)))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_lazy_names():
+    from dggbot.bot import DGGBot
+
+    assert dggbot.DGGBot is DGGBot
+    assert "StreamInfo" in dir(dggbot) and set(dggbot.__all__) <= set(dir(dggbot))
+    with pytest.raises(AttributeError):
+        dggbot.Nope
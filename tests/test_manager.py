@@ -0,0 +1,66 @@
+import asyncio
+import gc
+import weakref
+
+import pytest
+
+from dggbot import ClientManager, DGGChat
+from dggbot.aio import AsyncDGGBot, AsyncDGGChat, AsyncDGGLive
+
+
+def test_clients_share_the_loop_and_resources():
+    manager = ClientManager()
+    dgg = manager.add(AsyncDGGBot(), "dgg")
+    live = manager.add(AsyncDGGLive(), "live")
+    other = AsyncDGGChat()
+    assert dgg.dispatcher is live.dispatcher is manager.dispatcher
+    with pytest.raises(TypeError):
+        manager.add(DGGChat())
+    with pytest.raises(ValueError):
+        manager.add(AsyncDGGChat(), "dgg")
+
+    runs = []
+
+    async def fake_run_forever(client, name, origin=None):
+        runs.append(name)
+        client._stopping = False
+        while not client._stopping:
+            await asyncio.sleep(0.001)
+
+    for name, client in manager.clients.items():
+        client.run_forever = lambda origin, c=client, n=name: fake_run_forever(c, n)
+
+    async def main():
+        running = asyncio.ensure_future(manager.run_forever())
+        await asyncio.sleep(0.01)
+        other.run_forever = lambda origin: fake_run_forever(other, "late")
+        manager.add(other, "late")  # started right away
+        await asyncio.sleep(0.01)
+        await manager.remove("live")
+        assert list(manager.status()) == ["dgg", "late"]
+        await manager.close()
+        await asyncio.wait_for(running, 1)
+
+    asyncio.run(main())
+    assert sorted(runs) == ["dgg", "late", "live"]
+
+
+def test_metrics_are_labelled_by_name_and_removed():
+    manager = ClientManager()
+    a = manager.add(AsyncDGGChat(), "a")
+    a._on_message(None, 'JOIN {"nick": "Fritz", "features": [], "timestamp": 0}')
+    manager.add(AsyncDGGChat(), "b")  # same url as "a"
+    roster = manager.metrics.snapshot()["dggbot_roster_users"]
+    assert roster == {("a",): 1, ("b",): 0}
+
+    async def main():
+        manager.dispatcher.start()
+        await manager.remove("a")
+
+    asyncio.run(main())
+    a = weakref.ref(a)
+    gc.collect()
+    assert a() is None  # not kept alive by the registry
+    snapshot = manager.metrics.snapshot()
+    assert snapshot["dggbot_roster_users"] == {("b",): 0}
+    assert [labels for labels, _ in snapshot["latency"]] == [{"client": "b"}]
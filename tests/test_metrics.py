@@ -0,0 +1,135 @@
+import time
+import urllib.request
+
+import pytest
+
+from dggbot.errors import Throttled
+from dggbot.metrics import Histogram, LatencyStats, MetricsRegistry
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    assert histogram.percentile(50) is None
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+    histogram.record(-1)  # clock skew counts as no lag
+    assert histogram.count == 101 and histogram.max == 0.1
+    assert histogram.percentile(50) == pytest.approx(0.05, rel=0.25)
+    assert histogram.percentile(99) == pytest.approx(0.1, rel=0.25)
+    assert histogram.percentile(100) == 0.1
+
+
+def test_chat_latency(bot):
+    @bot.event()
+    def on_msg(msg):
+        time.sleep(0.01)
+
+    @bot.command()
+    def ping(msg):
+        pass
+
+    sent = int(time.time() * 1000) - 2000  # the server sent it 2 seconds ago
+    bot._on_message(
+        None, f'MSG {{"nick": "Fritz", "data": "!ping", "timestamp": {sent}}}'
+    )
+    bot.dispatcher.stop()
+    bot._on_pong(PingedSocket, b"")
+    stats = bot.latency.snapshot()
+    assert stats[LatencyStats.SERVER_LAG]["msg"]["p50"] == pytest.approx(2, rel=0.25)
+    assert stats[LatencyStats.HANDLER_TIME]["msg"]["max"] >= 0.01
+    # Every stage of the event under the same key, commands apart.
+    assert {event for events in stats.values() for event in events} == {"msg", "ws"}
+    commands = bot.latency.command_snapshot()
+    assert commands["ping"][LatencyStats.HANDLER_TIME]["count"] == 1
+    assert set(commands["ping"]) == {
+        LatencyStats.DISPATCH_LAG,
+        LatencyStats.HANDLER_TIME,
+    }
+    assert stats[LatencyStats.PING_RTT]["ws"]["max"] == pytest.approx(0.05)
+    labels = 'measurement="handler_time",event="msg",command="ping"'
+    assert (
+        f'dggbot_latency_seconds_count{{client="{bot.metrics_name}",{labels}}} 1'
+        in bot.metrics.prometheus()
+    )
+
+
+class PingedSocket:
+    last_ping_tm = 10.0
+    last_pong_tm = 10.05
+
+
+def test_registry():
+    registry = MetricsRegistry()
+    frames = registry.counter("frames_total", "Frames.", ("event",))
+    frames.inc("MSG")
+    frames.inc("MSG", amount=2)
+    registry.gauge("queue_depth", "Queue.").track(func=lambda: 7)
+    assert registry.counter("frames_total", "Frames.", ("event",)) is frames
+    with pytest.raises(ValueError):
+        registry.gauge("frames_total", "Frames.")
+    stats = LatencyStats()
+    stats.record(LatencyStats.HANDLER_TIME, "msg", 0.002)
+    registry.add_latency(stats, client="test")
+    snapshot = registry.snapshot()
+    assert snapshot["frames_total"] == {("MSG",): 3}
+    assert snapshot["queue_depth"] == 7
+
+    text = registry.prometheus()
+    assert '# TYPE frames_total counter\nframes_total{event="MSG"} 3\n' in text
+    assert "queue_depth 7\n" in text
+    labels = 'client="test",measurement="handler_time",event="msg"'
+    assert f'dggbot_latency_seconds_bucket{{{labels},le="+Inf"}} 1\n' in text
+    assert f"dggbot_latency_seconds_count{{{labels}}} 1\n" in text
+    buckets = [
+        int(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line.startswith("dggbot_latency_seconds_bucket")
+    ]
+    assert buckets == sorted(buckets) and buckets[0] == 0
+
+
+def test_serve():
+    registry = MetricsRegistry()
+    registry.counter("up_total", "Up.").inc()
+    server = registry.serve(0)
+    try:
+        assert registry.serve(0) is server
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert "up_total 1\n" in response.read().decode()
+    finally:
+        server.shutdown()
+
+
+def test_client_metrics(bot):
+    @bot.command(max_concurrency=1, saturation="drop")
+    def ping(msg):
+        pass
+
+    bot._on_message(None, 'MSG {"nick": "Fritz", "data": "!ping", "timestamp": 0}')
+    bot._on_message(None, 'JOIN {"nick": "Fritz", "features": [], "timestamp": 0}')
+    with pytest.raises(Throttled):
+        bot._on_err_frame({"description": "throttled"})
+    with pytest.raises(bot.codec.errors) as error:
+        bot._on_message(None, "MSG {not json")
+    bot._on_error(None, error.value)
+    bot.dispatcher.stop()
+    snapshot = bot.metrics.snapshot()
+    client = bot.metrics_name
+    assert snapshot["dggbot_frames_received_total"] == {
+        (client, "MSG"): 2,  # the malformed one too
+        (client, "JOIN"): 1,
+    }
+    assert snapshot["dggbot_commands_total"] == {(client, "ping", "run"): 1}
+    assert snapshot["dggbot_chat_errors_total"] == {(client, "Throttled"): 1}
+    assert snapshot["dggbot_decode_errors_total"] == {(client,): 1}
+    assert snapshot["dggbot_roster_users"] == {(client,): 1}
+    assert snapshot["dggbot_connected"] == {(client,): 0}
+    assert (
+        'dggbot_commands_total{client="%s",command="ping",status="run"} 1' % (client)
+        in bot.metrics.prometheus()
+    )
+    bot._unregister_metrics()
+    snapshot = bot.metrics.snapshot()
+    assert snapshot["dggbot_roster_users"] == {} and snapshot["latency"] == []
+    assert snapshot["dggbot_commands_total"] == {}
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from dggbot.errors import Banned, TooManyConnections
+from dggbot.reconnect import Backoff, ConnectionState
+
+
+def test_backoff_growth_jitter_and_hard_errors():
+    backoff = Backoff(base=1, cap=5, factor=2, jitter=0, hard_errors=(Banned,))
+    assert [backoff.delay() for _ in range(5)] == [1, 2, 4, 5, 5]
+    assert backoff.delay(Banned()) == backoff.delay(Banned) == 300
+    backoff.connected_for(10)
+    assert backoff.failures == 7
+    backoff.connected_for(60)
+    assert backoff.delay() == 1
+
+    jittered = Backoff(base=10, jitter=0.5)
+    for _ in range(20):
+        jittered.reset()
+        assert 5 <= jittered.delay() <= 10
+
+
+def test_run_forever_classifies_errors(chat, monkeypatch):
+    chat.backoff = Backoff(
+        base=0.01, jitter=0, hard_delay=0.05, hard_errors=(TooManyConnections,)
+    )
+    states, delays = [], []
+
+    @chat.event()
+    def on_state_change(old, new):
+        states.append(new)
+
+    def run(origin=None):
+        chat._set_state(ConnectionState.CONNECTING)
+        if len(delays) == 0:
+            chat.last_error = TooManyConnections()  # from an ERR frame
+        elif len(delays) == 1:
+            raise ConnectionRefusedError
+        else:
+            chat.stop()
+
+    reconnect_delay = chat._reconnect_delay
+    monkeypatch.setattr(chat, "run", run)
+    monkeypatch.setattr(
+        chat, "_reconnect_delay", lambda err: delays.append(reconnect_delay(err)) or 0
+    )
+    chat.run_forever()
+    chat.dispatcher.stop()
+    assert delays == [0.05, pytest.approx(0.02)]
+    assert chat.reconnects == 2 and chat.state == ConnectionState.STOPPED
+    assert states == ["connecting", "backoff"] * 2 + ["connecting", "stopped"]
+
+
+def test_state_changes_are_delivered_in_order(chat):
+    changes = []
+
+    @chat.event()
+    def on_state_change(old, new):
+        time.sleep(0.001)  # give the other workers a chance to overtake
+        changes.append((old, new))
+
+    states = [ConnectionState.CONNECTING, ConnectionState.BACKOFF] * 10
+    for state in states:
+        chat._set_state(state)
+    chat.dispatcher.stop()
+    assert changes == list(zip([ConnectionState.DISCONNECTED, *states], states))
@@ -0,0 +1,81 @@
+import json
+import threading
+from datetime import datetime
+
+from conftest import FLAIRS
+
+from dggbot.roster import Roster
+from dggbot.user import User
+
+
+def names(*nicks):
+    users = [{"nick": nick, "features": ["flair13"]} for nick in nicks]
+    return f"NAMES {json.dumps({'connectioncount': len(users), 'users': users})}"
+
+
+def test_snapshots_are_copy_on_write():
+    roster = Roster([User(1, "Fritz", None)])
+    snapshot = roster.snapshot()
+    assert roster.snapshot() is not snapshot  # a new view, but of the same dict
+    roster.add(User(2, "Cake", None))
+    roster.remove("FRITZ")
+    assert list(snapshot) == ["fritz"]
+    assert list(roster.snapshot()) == ["cake"] and "Cake" in roster
+    assert roster.remove("nobody") is None
+
+
+def test_names_join_quit(chat):
+    chat._on_message(None, names("Fritz", "Cake"))
+    chat._on_message(None, 'JOIN {"nick": "Destiny", "timestamp": 0}')
+    chat._on_message(None, 'QUIT {"nick": "Cake", "timestamp": 0}')
+    chat.dispatcher.stop()  # the NAMES list must not undo the JOIN/QUIT after it
+    assert sorted(chat.users) == ["destiny", "fritz"]
+    assert chat.get_user("fritz").features is chat.get_user("FRITZ").features
+
+
+def test_concurrent_updates():
+    roster = Roster()
+
+    def churn(start):
+        for i in range(start, start + 1000):
+            roster.add(User(i, f"user{i}", None))
+            roster.snapshot()
+            if i % 2:
+                roster.remove(f"user{i}")
+
+    threads = [threading.Thread(target=churn, args=(i * 1000,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(roster) == 2000
+
+
+def test_indexes():
+    tier1, tier3 = FLAIRS["flair13"], FLAIRS["flair3"]
+    roster = Roster(
+        [
+            User(1, "Fritz", datetime(2015, 1, 1), (tier3,)),
+            User(2, "Frank", datetime(2024, 1, 1), (tier1,)),
+            User(3, "Cake", None, (tier3, FLAIRS["subscriber"])),
+        ]
+    )
+    roster.add(User(4, "Fred", datetime(2024, 6, 1)))
+    roster.add(User(2, "Frank", datetime(2024, 1, 1), (tier3,)))  # rejoin, new flair
+    roster.remove("cake")
+    assert sorted(u.name for u in roster.with_flair("flair3", tier1)) == [
+        "Frank",
+        "Fritz",
+    ]
+    assert (
+        roster.count_with_flair(tier3) == 2 and roster.count_with_flair("flair13") == 0
+    )
+    assert [u.name for u in roster.created_after(datetime(2020, 1, 1))] == [
+        "Frank",
+        "Fred",
+    ]
+    assert [u.name for u in roster.created_between(end=datetime(2024, 1, 1))] == [
+        "Fritz"
+    ]
+    assert roster.complete("FR") == ["frank", "fred", "fritz"]
+    assert roster.complete("fr", limit=1) == ["frank"] and roster.complete("x") == []
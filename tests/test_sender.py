@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+
+import pytest
+
+from dggbot.errors import Throttled
+from dggbot.ratelimit import RateGovernor
+from dggbot.sender import Priority, SendQueue
+
+
+def decode(frames):
+    return [(t, json.loads(p)) for t, p in (f.split(" ", 1) for f in frames)]
+
+
+def test_sends_in_order_and_coalesces():
+    release = threading.Event()
+    written = []
+
+    def write(frame):
+        release.wait()
+        written.append(frame)
+
+    queue = SendQueue(write)
+    queue.put("MSG 0")
+    for i in range(1, 50):
+        queue.put(f"MSG {i}")
+        queue.put(f"CASTVOTE {i}", "CASTVOTE")
+    release.set()
+    assert queue.join(1)
+    msgs = [f for f in written if f.startswith("MSG")]
+    assert msgs == [f"MSG {i}" for i in range(50)]
+    votes = [f for f in written if f.startswith("CASTVOTE")]
+    assert votes[-1] == "CASTVOTE 49" and len(votes) < 49
+    assert queue.coalesced == 49 - len(votes)
+    assert queue.qsize() == 0 and queue.sent == len(written)
+
+
+def test_chat_send_methods(chat):
+    frames = []
+    chat.ws.send = frames.append
+    chat.send("hi")
+    chat.send_privmsg("Fritz", "yo")
+    chat.send_queue.join(1)
+    assert decode(frames) == [
+        ("MSG", {"data": "hi"}),
+        ("PRIVMSG", {"nick": "Fritz", "data": "yo"}),
+    ]
+
+
+def test_priority_lanes_and_governor():
+    written = []
+    governor = RateGovernor(rate=50, burst=1)
+    governor.consume()  # empty the bucket so every frame has to wait
+    queue = SendQueue(written.append, governor=governor)
+    queue.put("MSG low", priority=Priority.LOW, limited=True)
+    queue.put("MSG normal", limited=True)
+    queue.put("MSG high", priority=Priority.HIGH, limited=True)
+    assert queue.join(1)
+    assert written == ["MSG high", "MSG normal", "MSG low"]
+
+
+def test_governor_learns_from_throttle():
+    governor = RateGovernor()
+    for _ in range(5):
+        assert governor.delay() == 0
+        governor.consume()
+    governor.consume(retry=True)  # resent frames aren't part of the observed rate
+    assert len(governor._recent) == 5
+    governor.throttled()
+    # The burst was much faster than the server's limit, which is where the rate starts.
+    assert governor.ceiling > 100 and governor.rate == 1 / governor.throttle_window
+    assert governor.throttle_count == 1
+    governor.throttled(sent_at=0.0)  # sent before the last backoff, already counted
+    assert governor.rate == 1 / governor.throttle_window
+    governor.throttled()
+    assert governor.rate == governor.backoff / governor.throttle_window
+
+
+def test_governor_ignores_sparse_history(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    governor = RateGovernor(min_rate=0.5)
+    for _ in range(9):  # spread over an hour
+        governor.consume()
+        now[0] += 400
+    governor.consume()
+    now[0] += 0.5
+    governor.consume()
+    governor.throttled()
+    assert governor.ceiling == 2.0 and governor.rate == 1.0
+
+    now[0] += 9.5  # 3 sends in the last 10s, slower than min_rate
+    governor.consume()
+    governor.throttled()
+    assert governor.ceiling == governor.rate == governor.min_rate
+
+    now[0] += governor.ceiling_reset
+    governor.consume()
+    assert governor.ceiling is None and governor.rate > governor.min_rate
+
+
+def test_bot_queues_instead_of_dropping(bot):
+    frames = []
+    bot.ws.send = frames.append
+    bot.governor.rate = 100
+    bot.send("one")
+    bot.send("two")
+    assert bot.send_queue.join(1)
+    assert decode(frames) == [("MSG", {"data": "one"}), ("MSG", {"data": "two"})]
+    bot._on_me_frame({"nick": "Bot"})
+    bot._on_message(None, 'MSG {"nick": "Bot", "data": "one", "timestamp": 0}')
+    with pytest.raises(Throttled):
+        bot._on_message(None, 'ERR {"description": "throttled"}')
+    assert bot.send_queue.join(1)
+    assert decode(frames)[-1] == ("MSG", {"data": "two"}) and len(frames) == 3
+    assert bot.governor.throttle_count == 1 and bot.send_queue.unacked == 1
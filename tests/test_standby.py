@@ -0,0 +1,50 @@
+from dggbot import DGGBot, DGGChat
+from dggbot.errors import Throttled
+from dggbot.standby import FrameWindow
+
+MSG = 'MSG {"nick": "Fritz", "data": "hi", "timestamp": %d}'
+
+
+def test_frame_window_is_bounded():
+    window = FrameWindow(size=2)
+    assert window.first("a") and window.first("b") and not window.first("a")
+    assert window.first("c") and window.first("a")  # "a" fell out of the window
+    assert window.duplicates == 1 and len(window._seen) == 2
+
+
+def test_sockets_are_merged_without_duplicates():
+    chat = DGGChat(standby=True)
+    primary, standby = chat.ws, chat.standby.ws
+    frames = []
+    chat.raw()(lambda event_type, payload, received: frames.append(payload))
+    chat._connected = True
+
+    chat._on_message(primary, MSG % 1)
+    chat._on_message(standby, MSG % 1)  # copy of a frame the primary already had
+    chat._on_message(standby, MSG % 2)  # the primary is reconnecting
+    chat._on_message(primary, MSG % 2)
+    chat._on_message(standby, 'ERR {"description": "toomanyconnections"}')
+    chat._on_message(standby, 'NAMES {"connectioncount": 1, "users": []}')
+    chat._connected = False
+    chat._on_message(standby, 'NAMES {"connectioncount": 2, "users": []}')
+    chat.dispatcher.stop()
+    assert [frame[-2] for frame in frames[:2]] == ["1", "2"]
+    assert frames[2:] == ['{"connectioncount": 2, "users": []}']
+    assert chat.standby.last_error.__name__ == "TooManyConnections"
+    assert chat._frames.duplicates == 2
+
+
+def test_standby_is_off_by_default(chat):
+    assert chat.standby is None and chat._frames is None
+
+
+def test_primary_errors_are_not_deduplicated():
+    bot = DGGBot(standby=True)
+    errors = []
+    for _ in range(2):
+        try:
+            bot._on_message(bot.ws, 'ERR {"description": "throttled"}')
+        except Throttled as e:
+            errors.append(e)
+    bot.dispatcher.stop()
+    assert len(errors) == 2 and bot._frames.duplicates == 0
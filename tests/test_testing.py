@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from dggbot.flairs import FlairCatalog
+from dggbot.testing import MockChatServer, Traffic
+
+
+@pytest.fixture
+def server():
+    with MockChatServer(users=500, seed=1) as server:
+        yield server
+
+
+def test_traffic_shapes():
+    steady = Traffic({"MSG": 10, "JOIN": 2}, shape="steady").schedule()
+    events = [next(steady) for _ in range(24)]
+    assert [event for _, event in events].count("JOIN") == 4
+    assert [at for at, _ in events] == sorted(at for at, _ in events)
+
+    burst = Traffic({"MSG": 50}, shape="burst", period=0.5, seed=1).schedule()
+    assert {next(burst)[0] for _ in range(200)} <= {0.5 * i for i in range(1, 100)}
+    with pytest.raises(ValueError):
+        Traffic({"MSG": 1}, shape="sawtooth")
+
+
+def test_flairs_endpoint(server, tmp_path):
+    catalog = FlairCatalog(server.flairs_url, path=str(tmp_path / "flairs.json"))
+    assert catalog.refresh() is True
+    assert catalog["flair13"].label == "Subscriber Tier 1"
+    assert catalog.refresh() is False  # 304 Not Modified
+
+
+def test_chat_session(server):
+    from dggbot import DGGBot
+
+    bot = DGGBot("token", config=server.config(), owner="MockBot")
+    errors, messages = [], []
+    ready, replied = threading.Event(), threading.Semaphore(0)
+
+    @bot.event()
+    def on_names(count, users):
+        ready.set()
+
+    @bot.event()
+    def on_msg(msg):
+        messages.append(msg)
+        replied.release()
+
+    @bot.event()
+    def on_error(error):
+        errors.append(error.__name__)
+        replied.release()
+
+    thread = threading.Thread(target=bot.run, daemon=True)
+    thread.start()
+    try:
+        assert ready.wait(5)
+        assert bot.username == "MockBot" and len(bot.users) == 501
+        for text in ("hello", "too quick"):
+            bot._write_frame(f'MSG {{"data": "{text}"}}')
+        assert replied.acquire(timeout=5) and replied.acquire(timeout=5)
+        server.throttle = 0
+        bot._write_frame('MSG {"data": "hello"}')
+        assert replied.acquire(timeout=5)
+    finally:
+        bot.stop()
+        thread.join(5)
+        bot.dispatcher.stop()
+    assert [(msg.nick, msg.data) for msg in messages] == [("MockBot", "hello")]
+    assert sorted(errors) == ["DuplicateMessage", "Throttled"]
+
+
+def test_throttled_burst_arrives_in_order(server):
+    from dggbot import DGGBot
+
+    bot = DGGBot("token", config=server.config())
+    texts = ["one", "two", "three", "four", "five"]
+    messages = []
+    ready, done = threading.Event(), threading.Event()
+
+    @bot.event()
+    def on_names(count, users):
+        ready.set()
+
+    @bot.event()
+    def on_msg(msg):
+        messages.append(msg.data)
+        if len(messages) == len(texts):
+            done.set()
+
+    thread = threading.Thread(target=bot.run, daemon=True)
+    thread.start()
+    try:
+        assert ready.wait(5)
+        for text in texts:
+            bot.send(text)
+        assert done.wait(15)
+    finally:
+        bot.stop()
+        thread.join(5)
+        bot.dispatcher.stop()
+    assert messages == texts
+    assert bot.send_queue.retried >= 1 and bot.send_queue.unacked == 0
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import threading
+import time
+
+from dggbot import AsyncDGGBot
+from dggbot.watchdog import Watchdog
+
+
+def test_slow_handler_is_logged_with_its_stack(caplog):
+    watchdog = Watchdog(budget=0.02, keep=2, interval=0.005)
+    released = threading.Event()
+
+    def stuck_on_io():
+        job = watchdog.begin("stuck_on_io", "msg")
+        released.wait(5)
+        watchdog.finish(job)
+
+    with caplog.at_level(logging.INFO, "dgg-bot"):
+        thread = threading.Thread(target=stuck_on_io)
+        thread.start()
+        time.sleep(0.1)
+        assert watchdog.running == 1 and watchdog.slow == 1
+        released.set()
+        thread.join()
+    watchdog.stop()
+    warning = next(r for r in caplog.records if r.levelno == logging.WARNING)
+    assert "Handler stuck_on_io for msg has been running" in warning.message
+    assert "released.wait(5)" in warning.message  # where it's stuck
+    assert "finished after" in caplog.records[-1].message
+
+    for seconds in (0.3, 0.1, 0.2):
+        watchdog._stats["stuck_on_io"].add(seconds, "msg", watchdog.keep)
+    stats = watchdog.stats()["stuck_on_io"]
+    assert stats.count == 4 and watchdog.running == 0
+    assert [seconds for seconds, _ in stats.slowest] == [0.3, 0.2]
+
+
+def test_bot_handlers_and_commands(bot):
+    @bot.event()
+    def on_msg(msg):
+        time.sleep(0.02)
+
+    @bot.command()
+    def ping(msg):
+        pass
+
+    bot._on_message(None, 'MSG {"nick": "Fritz", "data": "!ping", "timestamp": 0}')
+    bot.dispatcher.stop()
+    stats = bot.watchdog.stats()
+    assert list(stats) == [
+        "test_bot_handlers_and_commands.<locals>.on_msg",
+        "command:ping",
+    ]
+    assert stats["command:ping"].slowest[0][1] == "command"
+    assert bot.watchdog.running == 0
+
+
+def test_async_command_stack(caplog):
+    bot = AsyncDGGBot()
+    bot.watchdog = Watchdog(budget=0.02, interval=0.005)
+
+    @bot.command()
+    async def slow(msg):
+        await asyncio.sleep(0.1)
+
+    async def main():
+        bot.dispatcher.start()
+        bot._on_message(None, 'MSG {"nick": "Fritz", "data": "!slow", "timestamp": 0}')
+        while not bot.watchdog.stats():
+            await asyncio.sleep(0.01)
+        bot.dispatcher.stop()
+
+    with caplog.at_level(logging.WARNING, "dgg-bot"):
+        asyncio.run(main())
+    bot.watchdog.stop()
+    assert "await asyncio.sleep(0.1)" in caplog.records[0].message
+    assert bot.watchdog.stats()["command:slow"].max >= 0.1